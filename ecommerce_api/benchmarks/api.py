@@ -0,0 +1,334 @@
+"""
+Latency, throughput and query counts of every route in products/urls.py
+and users/urls.py, driven through the Django test client with real JWT
+authentication against a database filled by benchmarks.seed.
+
+    python -m benchmarks.api --scale 5 --repeat 50 --json after.json
+    python -m benchmarks.api --scale 5 --repeat 50 --compare before.json
+
+The catalogue response cache is disabled unless --catalogue-cache is given,
+so repeated GETs measure the view rather than a cache hit. Write cases
+restore or recreate their own fixtures before each (unmeasured) call.
+"""
+import csv
+import io
+import itertools
+import json
+import platform
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from benchmarks import harness
+
+
+@dataclass
+class Case:
+    route: str
+    method: str
+    client: str  # 'anon', 'user' or 'admin'
+    prepare: Callable[[], tuple]  # unmeasured; returns (url, data)
+    status: int = 200
+    label: str = ''
+    format: Optional[str] = 'json'
+
+    @property
+    def name(self):
+        return ' '.join(filter(None, [self.route, self.method.upper(), self.label]))
+
+
+def route_names():
+    """Names of every URL pattern in products/urls.py and users/urls.py."""
+    from products import urls as product_urls
+    from users import urls as user_urls
+
+    names = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if hasattr(pattern, 'url_patterns'):
+                walk(pattern.url_patterns)
+            elif pattern.name:
+                names.add(pattern.name)
+
+    walk(product_urls.urlpatterns)
+    walk(user_urls.urlpatterns)
+    return names
+
+
+class Fixtures:
+    """Objects the cases point at, picked from seeded data."""
+
+    def __init__(self, password):
+        from django.contrib.auth import get_user_model
+        from products.models import Order, OrderItem, Product, Wishlist
+
+        User = get_user_model()
+        self.password = password
+        # The seeder's skew makes user0 the heaviest customer and the most
+        # reviewed product the hottest row.
+        self.user = User.objects.get(username='user0')
+        self.admin = User.objects.create_user(username='bench-admin', email='admin@example.com',
+                                              password=password, is_admin=True, is_staff=True)
+        self.product = Product.objects.order_by('-rating_count', 'pk').first()
+        Product.objects.filter(pk=self.product.pk).update(qnt=10 ** 9)
+        self.category = self.product.category
+        order = Order.objects.filter(user=self.user, items__isnull=False).order_by('-pk').first()
+        if order is None:
+            order = Order.objects.create(user=self.user, status='Completed', total_amount=self.product.price,
+                                         item_count=1)
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=self.product.price)
+        self.order = order
+        self.order_item = order.items.order_by('pk').first()
+        self.wishlist, _ = Wishlist.objects.get_or_create(user=self.user)
+        self.counter = itertools.count()
+
+    def unique(self, prefix):
+        return f'{prefix} {next(self.counter)}'
+
+    def clients(self):
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        clients = {'anon': APIClient()}
+        for name, user in [('user', self.user), ('admin', self.admin)]:
+            clients[name] = APIClient()
+            clients[name].credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return clients
+
+
+def build_cases(fx):
+    from django.contrib.auth import get_user_model
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+    from products.models import Category, Order, OrderItem, Product, ProductImage, Review, WishlistItem
+
+    def url(route, *args, query=''):
+        return reverse(route, args=args) + (f'?{query}' if query else '')
+
+    def get(route, *args, query=''):
+        return lambda: (url(route, *args, query=query), None)
+
+    def new_product():
+        return Product.objects.create(name=fx.unique('Bench product'), description='', price='9.99', qnt=100,
+                                      category=fx.category)
+
+    def new_pending_order():
+        order = Order.objects.create(user=fx.user, status='Pending', total_amount=fx.product.price, item_count=1)
+        OrderItem.objects.create(order=order, product=fx.product, quantity=1, price=fx.product.price)
+        return order
+
+    def import_file():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['sku', 'name', 'description', 'price', 'qnt', 'category'])
+        for i in range(100):
+            writer.writerow([f'BENCH-{i}', fx.unique('Imported'), 'Imported product', '5.00', 10, fx.category.name])
+        upload = SimpleUploadedFile('products.csv', out.getvalue().encode(), content_type='text/csv')
+        return url('product-import'), {'file': upload}
+
+    def wishlist_add():
+        WishlistItem.objects.filter(wishlist=fx.wishlist, product=fx.product).delete()
+        return url('wishlist'), {'product_id': fx.product.pk}
+
+    def wishlist_remove():
+        WishlistItem.objects.get_or_create(wishlist=fx.wishlist, product=fx.product)
+        return url('wishlist-remove'), {'product_id': fx.product.pk}
+
+    batch = list(Product.objects.order_by('pk').values_list('pk', flat=True)[:20])
+
+    def wishlist_batch_add():
+        WishlistItem.objects.filter(wishlist=fx.wishlist, product_id__in=batch).delete()
+        return url('wishlist-batch-add'), {'product_ids': batch}
+
+    def wishlist_batch_remove():
+        WishlistItem.objects.bulk_create([WishlistItem(wishlist=fx.wishlist, product_id=pk) for pk in batch],
+                                         ignore_conflicts=True)
+        return url('wishlist-batch-remove'), {'product_ids': batch}
+
+    product, category, order, item = fx.product.pk, fx.category.pk, fx.order.pk, fx.order_item.pk
+    review = Review.objects.filter(product=product).order_by('pk').values_list('pk', flat=True).first()
+    User = get_user_model()
+    return [
+        Case('api-root', 'get', 'anon', get('api-root')),
+
+        Case('category-list', 'get', 'anon', get('category-list')),
+        Case('category-tree', 'get', 'anon', get('category-tree')),
+        Case('category-detail', 'get', 'anon', get('category-detail', category)),
+        Case('category-list', 'post', 'admin', lambda: (url('category-list'), {'name': fx.unique('Bench category')}),
+             status=201),
+        Case('category-detail', 'patch', 'admin', lambda: (url('category-detail', category), {'parent_cat': None})),
+        Case('category-detail', 'delete', 'admin',
+             lambda: (url('category-detail', Category.objects.create(name=fx.unique('Doomed')).pk), None), status=204),
+
+        Case('product-list', 'get', 'anon', get('product-list')),
+        Case('product-list', 'get', 'anon', get('product-list', query='search=wireless'), label='search'),
+        Case('product-list', 'get', 'anon', get('product-list', query=f'category_tree={category}'), label='subtree'),
+        Case('product-list', 'get', 'anon', get('product-list', query='ordering=-rating_avg&rating_min=4'),
+             label='top-rated'),
+        Case('product-list', 'get', 'anon', get('product-list', query='fields=id,name,price'), label='sparse'),
+        Case('product-facets', 'get', 'anon', get('product-facets')),
+        Case('product-facets', 'get', 'anon', get('product-facets', query='search=wireless&price_buckets=0,50,200'),
+             label='search'),
+        Case('product-detail', 'get', 'anon', get('product-detail', product)),
+        Case('product-detail', 'get', 'anon', get('product-detail', product, query='expand=reviews,images'),
+             label='expanded'),
+        Case('product-list', 'post', 'admin', lambda: (url('product-list'), {
+            'name': fx.unique('Bench product'), 'description': 'Created by the benchmark', 'price': '19.99',
+            'qnt': 10, 'category_id': category}), status=201),
+        Case('product-detail', 'patch', 'admin', lambda: (url('product-detail', product), {'price': '24.99'})),
+        Case('product-detail', 'delete', 'admin', lambda: (url('product-detail', new_product().pk), None),
+             status=204),
+
+        Case('product-image-list', 'get', 'anon', get('product-image-list')),
+        Case('product-image-detail', 'get', 'anon',
+             lambda: (url('product-image-detail', ProductImage.objects.values_list('pk', flat=True).first()), None)),
+        Case('product-image-list', 'post', 'admin', lambda: (url('product-image-list'), {
+            'product': product, 'image_url': f'https://img.example.com/bench/{next(fx.counter)}.jpg'}), status=201),
+        Case('product-image-detail', 'delete', 'admin', lambda: (url('product-image-detail', ProductImage.objects.create(
+            product_id=product, image_url=f'https://img.example.com/doomed/{next(fx.counter)}.jpg').pk), None),
+             status=204),
+
+        Case('product-reviews-list', 'get', 'anon', get('product-reviews-list', product)),
+        Case('product-reviews-detail', 'get', 'anon', get('product-reviews-detail', product, review)),
+        Case('product-reviews-list', 'post', 'user', lambda: (url('product-reviews-list', product), {
+            'title': 'Benchmark', 'rating': 4, 'comment': 'Measured'}), status=201),
+        Case('product-reviews-detail', 'patch', 'user', lambda: (url('product-reviews-detail', product, Review.objects.create(
+            user=fx.user, product_id=product, rating=3, title='Benchmark', comment='').pk), {'rating': 5})),
+        Case('product-reviews-detail', 'delete', 'user', lambda: (url('product-reviews-detail', product, Review.objects.create(
+            user=fx.user, product_id=product, rating=3, title='Benchmark', comment='').pk), None), status=204),
+
+        Case('wishlist', 'get', 'user', get('wishlist')),
+        Case('wishlist', 'post', 'user', wishlist_add, status=201),
+        Case('wishlist-remove', 'post', 'user', wishlist_remove),
+        Case('wishlist', 'get', 'user', get('wishlist', query='view=cards'), label='cards'),
+        Case('wishlist', 'get', 'user', get('wishlist', query='view=ids'), label='ids'),
+        Case('wishlist', 'get', 'user', get('wishlist', query='view=count'), label='count'),
+        Case('wishlist-batch-add', 'post', 'user', wishlist_batch_add, status=201),
+        Case('wishlist-batch-remove', 'post', 'user', wishlist_batch_remove),
+
+        Case('order-list', 'get', 'user', get('order-list')),
+        Case('order-list', 'get', 'user', get('order-list', query='view=summary'), label='summary'),
+        Case('order-detail', 'get', 'user', get('order-detail', order)),
+        Case('order-list', 'post', 'user', lambda: (url('order-list'), {
+            'items': [{'product_id': product, 'quantity': 1}]})),
+        Case('order-cancel', 'post', 'user', lambda: (url('order-cancel', new_pending_order().pk), None)),
+        Case('order-bulk-cancel', 'post', 'admin', lambda: (url('order-bulk-cancel'), {
+            'ids': [new_pending_order().pk for _ in range(20)]})),
+        Case('order-detail', 'delete', 'user', lambda: (url('order-detail', new_pending_order().pk), None),
+             status=204),
+
+        Case('order-item-list', 'get', 'user', get('order-item-list')),
+        Case('order-item-detail', 'get', 'user', get('order-item-detail', item)),
+        Case('order-item-detail', 'delete', 'user',
+             lambda: (url('order-item-detail', new_pending_order().items.get().pk), None), status=204),
+
+        Case('cache-stats', 'get', 'admin', get('cache-stats')),
+        Case('export', 'get', 'admin', lambda: (reverse('export', args=['orders']) + '?output=ndjson', None)),
+        Case('product-import', 'post', 'admin', import_file, format='multipart'),
+
+        Case('user_register', 'post', 'anon', lambda: (url('user_register'), {
+            'username': fx.unique('bench').replace(' ', '-'), 'email': 'bench@example.com',
+            'password': 'Correct-Horse-Battery-9'}), status=201),
+        Case('user-list', 'get', 'admin', get('user-list')),
+        Case('user-detail', 'get', 'admin', get('user-detail', fx.user.pk)),
+        Case('user-detail', 'patch', 'admin', lambda: (url('user-detail', fx.user.pk), {'email': 'user0@example.com'})),
+        Case('user-detail', 'delete', 'admin', lambda: (url('user-detail', User.objects.create(
+            username=fx.unique('doomed').replace(' ', '-'), email='doomed@example.com').pk), None), status=204),
+    ]
+
+
+def run_case(case, clients, repeat):
+    client = clients[case.client]
+    sizes = []
+
+    def call(prepared):
+        path, data = prepared
+        response = getattr(client, case.method)(path, data, format=case.format)
+        if response.status_code != case.status:
+            raise AssertionError(f'{case.name}: expected {case.status}, got {response.status_code}')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        sizes.append(len(body))
+
+    call(case.prepare())  # warm-up, also checks the expected status
+    sizes.clear()
+    stats = harness.measure(call, repeat, setup=case.prepare)
+    stats['bytes'] = max(sizes)
+    return stats
+
+
+def metadata(args, sizes):
+    import django
+    from django.db import connection
+
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'scale': args.scale,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'catalogue_cache': args.catalogue_cache,
+        'rows': asdict(sizes),
+    }
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    baseline = baseline.get('results', baseline)
+    print(f'\n{"case":>40} {"p50 before":>12} {"p50 after":>12} {"change":>8} {"queries":>10}')
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        change = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+        print(f'{name:>40} {old["p50_ms"]:>12} {stats["p50_ms"]:>12} {change:>+7.1f}% '
+              f'{old["queries"]:>4} -> {stats["queries"]:<3}')
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--scale', type=float, default=1.0, help='Seeder scale; 1 is 1,000 products.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', help='Run only cases whose name contains this text.')
+    parser.add_argument('--catalogue-cache', action='store_true', help='Keep the catalogue response cache on.')
+    parser.add_argument('--compare', metavar='JSON', help='Print p50 changes against an earlier --json file.')
+    args = parser.parse_args()
+    harness.setup()
+
+    from django.test.utils import override_settings
+    from benchmarks.seed import seed
+
+    cache = {} if args.catalogue_cache else harness.without_catalogue_cache()
+    password = 'bench-pass-123'
+    with harness.test_database(), override_settings(**cache):
+        sizes = seed(args.scale, args.seed, password=password)
+        fixtures = Fixtures(password)
+        clients = fixtures.clients()
+        cases = build_cases(fixtures)
+        missing = route_names() - {case.route for case in cases}
+        if missing:
+            print(f'Routes without a benchmark case: {", ".join(sorted(missing))}', file=sys.stderr)
+        results = {
+            case.name: run_case(case, clients, args.repeat)
+            for case in cases if not args.only or args.only in case.name
+        }
+        meta = metadata(args, sizes)
+
+    harness.report(results, args.json_path, meta=meta)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
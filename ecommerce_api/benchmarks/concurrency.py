@@ -0,0 +1,221 @@
+"""
+Throughput and tail latency of the catalogue reads under concurrent load,
+served through the WSGI handler from a thread pool and through the ASGI
+handler from concurrent coroutines, both in-process against a database
+filled by benchmarks.seed.
+
+    python -m benchmarks.concurrency --scale 2 --concurrency 1 8 32
+    python -m benchmarks.concurrency --db-latency-ms 2    # a networked database
+
+--db-latency-ms adds a sleep to every SQL statement, standing in for the
+round trip to a database server; that wait is what concurrent requests can
+overlap. --url skips the in-process handlers and loads a running server
+(e.g. `uvicorn ecommerce_api.asgi:application`) over HTTP/1.1 keep-alive.
+
+The catalogue response cache is disabled, as in benchmarks.api.
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks import harness
+
+
+def catalogue_paths():
+    from products.models import Category, Product
+
+    product = Product.objects.order_by('-rating_count', 'pk').first()
+    category = Category.objects.order_by('pk').first()
+    return [
+        '/api/v1/products/',
+        '/api/v1/products/?search=steel&page_size=10',
+        f'/api/v1/products/?category_tree={category.pk}&ordering=price',
+        f'/api/v1/products/{product.pk}/',
+        '/api/v1/categories/',
+        f'/api/v1/categories/{category.pk}/',
+        f'/api/v1/products/{product.pk}/reviews/',
+    ]
+
+
+def summarize(timings, errors, elapsed):
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(harness.percentile(timings, 50), 3),
+        'p95_ms': round(harness.percentile(timings, 95), 3),
+        'p99_ms': round(harness.percentile(timings, 99), 3),
+    }
+
+
+def run_wsgi(paths, concurrency, total):
+    from wsgiref.util import setup_testing_defaults
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+
+    def call(index):
+        path, _, query = paths[index % len(paths)].partition('?')
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': 'testserver',
+                   'SERVER_NAME': 'testserver', 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - start, statuses[0].startswith('200')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+    return summarize([seconds * 1000 for seconds, _ in results], sum(not ok for _, ok in results), elapsed)
+
+
+async def run_asgi(paths, concurrency, total):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    queue = list(range(total))
+    timings, errors = [], 0
+
+    async def call(index):
+        path, _, query = paths[index % len(paths)].partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        requested = asyncio.Event()
+        sent = {}
+
+        async def receive():
+            if not requested.is_set():
+                requested.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Future()  # no disconnect; cancelled once the response is sent
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                sent['status'] = message['status']
+
+        start = time.perf_counter()
+        await application(scope, receive, send)
+        return time.perf_counter() - start, sent.get('status') == 200
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            seconds, ok = await call(queue.pop())
+            timings.append(seconds * 1000)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(timings, errors, time.perf_counter() - start)
+
+
+async def run_url(base_url, paths, concurrency, total):
+    """Load a live server with `concurrency` keep-alive HTTP/1.1 connections."""
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    queue = list(range(total))
+    timings, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                path = paths[queue.pop() % len(paths)]
+                start = time.perf_counter()
+                writer.write(f'GET {parts.path.rstrip("/")}{path} HTTP/1.1\r\nHost: {parts.netloc}\r\n\r\n'.encode())
+                await writer.drain()
+                status_line = await reader.readline()
+                length = 0
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                await reader.readexactly(length)
+                timings.append((time.perf_counter() - start) * 1000)
+                errors += status_line.split()[1:2] != [b'200']
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(timings, errors, time.perf_counter() - start)
+
+
+def add_db_latency(milliseconds):
+    """Sleep `milliseconds` around every statement on every connection opened from now on."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # Inserted first: a connection opened mid-request already carries the
+        # metrics middleware's wrapper, which is popped off the end.
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, wrapper)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(None, connection)
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--scale', type=float, default=1.0, help='Seeder scale; 1 is 1,000 products.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=400, help='Requests per mode and concurrency level.')
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], nargs='+', default=['wsgi', 'asgi'])
+    parser.add_argument('--url', help='Base URL of a running server to load instead.')
+    parser.add_argument('--path', action='append', help='With --url: a path to request (repeatable).')
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        paths = args.path or ['/api/v1/products/', '/api/v1/categories/']
+        for concurrency in args.concurrency:
+            results[f'http c={concurrency}'] = asyncio.run(run_url(args.url, paths, concurrency, args.requests))
+        harness.report(results, args.json_path)
+        return
+
+    harness.setup()
+    from django.test.utils import override_settings
+    from benchmarks.seed import seed
+
+    with harness.test_database(), override_settings(**harness.without_catalogue_cache()):
+        seed(args.scale, args.seed)
+        paths = catalogue_paths()
+        if args.db_latency_ms:
+            add_db_latency(args.db_latency_ms)
+        for concurrency in args.concurrency:
+            for mode in args.mode:
+                if mode == 'wsgi':
+                    stats = run_wsgi(paths, concurrency, args.requests)
+                else:
+                    stats = asyncio.run(run_asgi(paths, concurrency, args.requests))
+                results[f'{mode} c={concurrency}'] = stats
+                if stats['errors']:
+                    print(f'{mode} c={concurrency}: {stats["errors"]} non-200 responses', file=sys.stderr)
+
+    harness.report(results, args.json_path, meta={
+        'scale': args.scale, 'seed': args.seed, 'db_latency_ms': args.db_latency_ms, 'paths': paths,
+    })
+
+
+if __name__ == '__main__':
+    main()
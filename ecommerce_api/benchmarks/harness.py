@@ -0,0 +1,103 @@
+"""
+Shared plumbing for the benchmark scripts.
+
+Benchmarks run against a throwaway test database created the same way
+`manage.py test` does, so they never touch db.sqlite3:
+
+    python -m benchmarks.order_items
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_api.settings')
+    django.setup()
+
+
+def argument_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per case.')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+    return parser
+
+
+@contextmanager
+def test_database():
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    runner = DiscoverRunner(verbosity=0)
+    setup_test_environment()
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+def without_catalogue_cache():
+    """
+    override_settings() arguments pointing the catalogue response cache at
+    a dummy backend, so repeated GETs measure the view. Other caches, such
+    as the JWT principal cache, stay on.
+    """
+    from django.conf import settings
+
+    return {
+        'CACHES': {**settings.CACHES, 'benchmark-dummy': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        'CATALOGUE_CACHE_ALIAS': 'benchmark-dummy',
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(fn, repeat, setup=None):
+    """
+    Call `fn` `repeat` times and return latency (milliseconds) and query
+    statistics. `setup` runs before each call and is not measured; its
+    return value is passed to `fn`. `rps` is the sequential throughput,
+    calls per second of measured time.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings, queries = [], []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            fn(arg) if setup else fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+    return {
+        'runs': repeat,
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'rps': round(repeat / sum(timings) * 1000, 1),
+        'queries': max(queries),
+    }
+
+
+def report(results, json_path=None, meta=None):
+    columns = list(next(iter(results.values()), {}))
+    width = max([14] + [len(case) for case in results])
+    print(f'{"case":>{width}} ' + ' '.join(f'{column:>14}' for column in columns))
+    for case, stats in results.items():
+        print(f'{case:>{width}} ' + ' '.join(f'{str(stats.get(column, "")):>14}' for column in columns))
+    if json_path:
+        with open(json_path, 'w') as fh:
+            json.dump({'meta': meta, 'results': results} if meta else results, fh, indent=2, sort_keys=True)
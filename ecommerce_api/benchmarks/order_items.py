@@ -0,0 +1,77 @@
+"""
+Compare the per-line and the batched implementation of
+OrderSerializer.update_items: statements issued and time spent inside the
+transaction for carts of increasing size.
+
+    python -m benchmarks.order_items --lines 1 10 50
+"""
+from benchmarks import harness
+
+
+def legacy_update_items(order, items_data):
+    # The previous implementation: one read-modify-write per line.
+    from rest_framework import serializers
+    from products.models import OrderItem
+
+    for item_data in items_data:
+        product = item_data['product']
+        quantity = item_data['quantity']
+        if product.qnt >= quantity:
+            product.qnt -= quantity
+            product.save()
+            order_item, created = OrderItem.objects.get_or_create(
+                order=order,
+                product=product,
+                defaults={'quantity': quantity, 'price': product.price}
+            )
+            if not created:
+                order_item.quantity += quantity
+                order_item.save()
+        else:
+            raise serializers.ValidationError(f'Not enough stock for {product.name}.')
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+    harness.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from products.models import Category, Order, Product
+    from products.serializers import OrderSerializer
+
+    implementations = {
+        'legacy': legacy_update_items,
+        'batched': OrderSerializer().update_items,
+    }
+
+    results = {}
+    with harness.test_database():
+        user = get_user_model().objects.create_user('bench', 'bench@example.com', 'bench-pass')
+        category = Category.objects.create(name='Bench')
+        products = Product.objects.bulk_create(
+            Product(name=f'Product {i}', description='', price='9.99', qnt=10 ** 9, category=category)
+            for i in range(max(args.lines))
+        )
+
+        for lines in args.lines:
+            for name, update_items in implementations.items():
+                def setup():
+                    order = Order.objects.create(user=user)
+                    items = [{'product': product, 'quantity': 1} for product in Product.objects.filter(
+                        pk__in=[p.pk for p in products[:lines]])]
+                    return order, items
+
+                def run(arg):
+                    with transaction.atomic():
+                        update_items(*arg)
+
+                results[f'{name}-{lines}'] = harness.measure(run, args.repeat, setup=setup)
+
+    harness.report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    main()
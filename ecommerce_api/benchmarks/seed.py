@@ -0,0 +1,175 @@
+"""
+Deterministic bulk data seeder for benchmarks.
+
+Row counts scale linearly with `scale` (scale=1 is 1,000 products);
+popularity follows a Zipf-like skew, so a few products collect most
+reviews, order lines and wishlist entries, and a few users place most
+orders. The same `seed` always produces the same data.
+
+    python -m benchmarks.seed --scale 10     # seeds a throwaway test database
+"""
+import random
+from dataclasses import dataclass
+from decimal import Decimal
+
+BATCH_SIZE = 5000
+
+
+@dataclass
+class SeedSizes:
+    categories: int
+    products: int
+    users: int
+    reviews: int
+    orders: int
+
+    @classmethod
+    def for_scale(cls, scale):
+        return cls(
+            categories=max(10, int(50 * scale ** 0.5)),
+            products=int(1000 * scale),
+            users=int(200 * scale),
+            reviews=int(5000 * scale),
+            orders=int(1000 * scale),
+        )
+
+
+class Zipf:
+    """Draws indexes in [0, n) with P(i) proportional to 1 / (i + 1) ** s."""
+
+    def __init__(self, rng, n, s=1.1):
+        self.rng = rng
+        weights = [1 / (i + 1) ** s for i in range(n)]
+        total, acc = sum(weights), 0.0
+        self.cumulative = []
+        for weight in weights:
+            acc += weight / total
+            self.cumulative.append(acc)
+
+    def draw(self):
+        from bisect import bisect_left
+        return min(bisect_left(self.cumulative, self.rng.random()), len(self.cumulative) - 1)
+
+
+def _chunks(iterable, size=BATCH_SIZE):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _bulk(model, objects):
+    created = []
+    for chunk in _chunks(objects):
+        created.extend(model.objects.bulk_create(chunk, batch_size=BATCH_SIZE))
+    return created
+
+
+def seed(scale=1.0, seed=42, password='bench-pass-123'):
+    """Populate the current database and return the SeedSizes used."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from products.models import (Category, Order, OrderItem, Product, ProductImage, Review, Wishlist,
+                                 WishlistItem)
+    from products.order_totals import rebuild_order_totals
+    from products.ratings import rebuild_rating_stats
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    sizes = SeedSizes.for_scale(scale)
+
+    # Categories: a tenth are roots, the rest hang under earlier categories.
+    roots = max(1, sizes.categories // 10)
+    categories = _bulk(Category, (Category(name=f'Category {i}') for i in range(sizes.categories)))
+    parents = {}
+    for index, category in enumerate(categories[roots:], start=roots):
+        parent = categories[rng.randrange(index)]
+        category.parent_cat_id = parent.pk
+        parents[category.pk] = parent.pk
+    Category.objects.bulk_update(categories[roots:], ['parent_cat'], batch_size=BATCH_SIZE)
+    paths = {}
+    for category in categories:
+        parent = parents.get(category.pk)
+        paths[category.pk] = f'{paths[parent] if parent else "/"}{category.pk}/'
+        category.path = paths[category.pk]
+    Category.objects.bulk_update(categories, ['path'], batch_size=BATCH_SIZE)
+
+    words = ['steel', 'oak', 'wireless', 'organic', 'compact', 'deluxe', 'travel', 'classic', 'smart', 'vintage']
+    category_pick = Zipf(rng, len(categories))
+    products = _bulk(Product, (
+        Product(
+            sku=f'SKU-{i:08d}',
+            name=f'{rng.choice(words).title()} {rng.choice(words)} item {i}',
+            description=' '.join(rng.choice(words) for _ in range(rng.randint(10, 60))),
+            price=Decimal(rng.randint(100, 100000)) / 100,
+            qnt=rng.randint(0, 10 ** 6),
+            category_id=categories[category_pick.draw()].pk,
+            is_active=rng.random() > 0.05,
+        )
+        for i in range(sizes.products)
+    ))
+    _bulk(ProductImage, (
+        ProductImage(product_id=product.pk, image_url=f'https://img.example.com/{product.pk}/{n}.jpg')
+        for product in products for n in range(rng.randint(0, 4))
+    ))
+
+    password_hash = make_password(password)
+    users = _bulk(User, (
+        User(username=f'user{i}', email=f'user{i}@example.com', password=password_hash)
+        for i in range(sizes.users)
+    ))
+
+    product_pick = Zipf(rng, len(products))
+    user_pick = Zipf(rng, len(users), s=0.8)
+    _bulk(Review, (
+        Review(user_id=users[rng.randrange(len(users))].pk, product_id=products[product_pick.draw()].pk,
+               rating=min(5, max(1, int(rng.gauss(4, 1)))), title='Review', comment='Lorem ipsum dolor sit amet')
+        for _ in range(sizes.reviews)
+    ))
+    rebuild_rating_stats()
+
+    statuses = ['Completed'] * 7 + ['Processing', 'Cancelled', 'Pending']
+    orders = _bulk(Order, (
+        Order(user_id=users[user_pick.draw()].pk, status=rng.choice(statuses)) for _ in range(sizes.orders)
+    ))
+
+    def order_items():
+        for order in orders:
+            picked = {products[product_pick.draw()] for _ in range(rng.randint(1, 5))}
+            for product in picked:
+                yield OrderItem(order_id=order.pk, product_id=product.pk, quantity=rng.randint(1, 3),
+                                price=product.price)
+    _bulk(OrderItem, order_items())
+    rebuild_order_totals()
+
+    wishlists = _bulk(Wishlist, (Wishlist(user_id=user.pk) for user in users))
+
+    def wishlist_items():
+        for wishlist in wishlists:
+            for product_id in {products[product_pick.draw()].pk for _ in range(rng.randint(0, 8))}:
+                yield WishlistItem(wishlist_id=wishlist.pk, product_id=product_id)
+    _bulk(WishlistItem, wishlist_items())
+    return sizes
+
+
+def main():
+    from benchmarks import harness
+    import time
+
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    harness.setup()
+    with harness.test_database():
+        start = time.perf_counter()
+        sizes = seed(args.scale, args.seed)
+        print(f'Seeded {sizes} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
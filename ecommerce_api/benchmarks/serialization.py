@@ -0,0 +1,87 @@
+"""
+Serializations per second of the product, review and category list pages:
+the DRF serializers versus the values()-based fast path used by the list
+endpoints (products/fastpath.py). Query time is included in both.
+
+    python -m benchmarks.serialization --page-size 20
+"""
+import time
+from benchmarks import harness
+
+
+def throughput(fn, seconds):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        count += len(fn())
+    return round(count / (time.perf_counter() - start))
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=2.0, help='Time spent per case.')
+    args = parser.parse_args()
+    harness.setup()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.request import Request
+    from products import fastpath
+    from products.models import Category, Product, ProductImage, Review
+    from products.serializers import CategorySerializer, ProductSerializer, ReviewSerializer
+
+    size = args.page_size
+    results = {}
+    with harness.test_database():
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'user{i}', email=f'user{i}@example.com') for i in range(size)
+        )
+        root = Category.objects.create(name='Root')
+        categories = Category.objects.bulk_create(Category(name=f'Category {i}', parent_cat=root) for i in range(size))
+        products = Product.objects.bulk_create(
+            Product(name=f'Product {i}', description='Lorem ipsum ' * 20, price='19.99', qnt=5,
+                    category=categories[i % size])
+            for i in range(size)
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, image_url=f'http://example.com/{product.pk}/{n}.png')
+            for product in products for n in range(3)
+        )
+        Review.objects.bulk_create(
+            Review(user=user, product=product, rating=4, title='Fine', comment='Does the job')
+            for product in products for user in users[:5]
+        )
+
+        context = {'request': Request(APIRequestFactory().get('/api/v1/products/'))}
+        cases = {
+            'products': (
+                lambda: ProductSerializer(Product.objects.with_related()[:size], many=True, context=context).data,
+                fastpath.RowPlan(ProductSerializer(context=context), fastpath.PRODUCT_STRING_COLUMNS,
+                                 {'image_url': fastpath.product_image_urls, 'reviews': fastpath.product_reviews}),
+                Product.objects.all(),
+            ),
+            'reviews': (
+                lambda: ReviewSerializer(Review.objects.select_related('user')[:size], many=True).data,
+                fastpath.RowPlan(ReviewSerializer(), fastpath.REVIEW_STRING_COLUMNS),
+                Review.objects.all(),
+            ),
+            'categories': (
+                lambda: CategorySerializer(Category.objects.prefetch_related('subcategories')[:size], many=True).data,
+                fastpath.RowPlan(CategorySerializer(), relations={
+                    'subcategories': fastpath.category_subcategory_names}),
+                Category.objects.all(),
+            ),
+        }
+        for name, (serializer_page, plan, queryset) in cases.items():
+            fast_page = lambda: plan.render(queryset.values(*plan.columns)[:size])  # noqa: E731
+            results[name] = {
+                'serializer_per_sec': throughput(serializer_page, args.seconds),
+                'fast_path_per_sec': throughput(fast_page, args.seconds),
+            }
+            results[name]['speedup'] = round(results[name]['fast_path_per_sec'] / results[name]['serializer_per_sec'], 2)
+
+    harness.report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Catalogue readers against order and wishlist writers on a file-backed
+SQLite database, under Django's defaults (rollback journal) and under the
+production profile of ecommerce_api/sqlite.py, without and with the
+in-process write queue.
+
+    python -m benchmarks.sqlite_writes --readers 8 --writers 4 --seconds 5
+
+Reader threads GET catalogue pages and writer threads POST to the order
+and wishlist endpoints, all through the WSGI handler. Each profile gets a
+fresh database filled by benchmarks.seed and is run readers-only first;
+compare the reader percentiles of the two rows. A request that fails
+(`database is locked` surfaces as a 500) counts as an error.
+"""
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import harness
+
+PROFILES = {
+    'default': ({}, {}, False),
+    'wal': ('production', {'transaction_mode': 'IMMEDIATE', 'timeout': 5}, False),
+    'wal+queue': ('production', {'transaction_mode': 'IMMEDIATE', 'timeout': 5}, True),
+}
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024, 'cache_size': -64 * 1024, 'temp_store': 'MEMORY',
+}
+
+
+def call(handler, method, path, body=None, token=None):
+    from wsgiref.util import setup_testing_defaults
+
+    path, _, query = path.partition('?')
+    data = json.dumps(body).encode() if body is not None else b''
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': 'testserver',
+               'SERVER_NAME': 'testserver', 'wsgi.input': io.BytesIO(data), 'CONTENT_LENGTH': str(len(data)),
+               'CONTENT_TYPE': 'application/json'}
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    setup_testing_defaults(environ)
+    statuses = []
+    start = time.perf_counter()
+    response = handler(environ, lambda status, headers: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return (time.perf_counter() - start) * 1000, int(statuses[0].split()[0]) < 400
+
+
+def writer_requests(rng, tokens, product_ids):
+    """An endless mix of cart additions and wishlist batch adds and removes."""
+    while True:
+        token = rng.choice(tokens)
+        picked = rng.sample(product_ids, 3)
+        kind = rng.randrange(3)
+        if kind == 0:
+            yield 'POST', '/api/v1/orders/', {'items': [{'product_id': picked[0], 'quantity': 1}]}, token
+        elif kind == 1:
+            yield 'POST', '/api/v1/wishlist/batch-add/', {'product_ids': picked}, token
+        else:
+            yield 'POST', '/api/v1/wishlist/batch-remove/', {'product_ids': picked}, token
+
+
+def run(paths, tokens, product_ids, readers, writers, seconds):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+
+    handler = WSGIHandler()
+    stop = threading.Event()
+    results = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def loop(kind, requests):
+        timings, failed = [], 0
+        try:
+            while not stop.is_set():
+                milliseconds, ok = call(handler, *next(requests))
+                timings.append(milliseconds)
+                failed += not ok
+        finally:
+            connections.close_all()
+            with lock:
+                results[kind].extend(timings)
+                errors[kind] += failed
+
+    def reads(rng):
+        while True:
+            yield 'GET', rng.choice(paths), None, None
+
+    threads = [threading.Thread(target=loop, args=('read', reads(random.Random(n)))) for n in range(readers)]
+    threads += [
+        threading.Thread(target=loop, args=('write', writer_requests(random.Random(1000 + n), tokens, product_ids)))
+        for n in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    reads_ms = results['read']
+    return {
+        'read_rps': round(len(reads_ms) / elapsed, 1),
+        'read_p50_ms': round(harness.percentile(reads_ms, 50), 2),
+        'read_p99_ms': round(harness.percentile(reads_ms, 99), 2),
+        'read_max_ms': round(max(reads_ms), 2),
+        'read_errors': errors['read'],
+        'write_rps': round(len(results['write']) / elapsed, 1),
+        'write_p99_ms': round(harness.percentile(results['write'], 99), 2) if results['write'] else '',
+        'write_errors': errors['write'],
+    }
+
+
+def main():
+    parser = harness.argument_parser(__doc__)
+    parser.add_argument('--scale', type=float, default=0.5, help='Seeder scale; 1 is 1,000 products.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run.')
+    parser.add_argument('--profile', choices=list(PROFILES), nargs='+', default=list(PROFILES))
+    args = parser.parse_args()
+    harness.setup()
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)  # failed writes are counted instead
+
+    from django.db import connections
+    from django.test.utils import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    from benchmarks.concurrency import catalogue_paths
+    from benchmarks.seed import seed
+    from products.models import Product
+    from users.models import CustomUser
+
+    if connections['default'].vendor != 'sqlite':
+        sys.exit('This benchmark needs the SQLite backend.')
+
+    results = {}
+    database = connections.settings['default']
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.profile:
+            pragmas, options, queue = PROFILES[name]
+            database['TEST']['NAME'] = os.path.join(directory, f'{name}.sqlite3')
+            database['OPTIONS'] = dict(options)
+            overrides = dict(harness.without_catalogue_cache(), SQLITE_SERIALIZE_WRITES=queue,
+                             SQLITE_PRAGMAS=PRODUCTION_PRAGMAS if pragmas else {})
+            with harness.test_database(), override_settings(**overrides):
+                connections.close_all()  # reopened with this profile's pragmas
+                seed(args.scale, args.seed)
+                paths = catalogue_paths()
+                tokens = [str(AccessToken.for_user(user)) for user in CustomUser.objects.order_by('pk')[:50]]
+                product_ids = list(Product.objects.filter(qnt__gte=10 ** 4).values_list('pk', flat=True))
+                connections.close_all()
+                results[f'{name} readers-only'] = run(paths, tokens, product_ids, args.readers, 0, args.seconds)
+                results[name] = run(paths, tokens, product_ids, args.readers, args.writers, args.seconds)
+                connections.close_all()
+
+    harness.report(results, args.json_path, meta={
+        'scale': args.scale, 'seed': args.seed, 'readers': args.readers, 'writers': args.writers,
+        'seconds': args.seconds, 'production_pragmas': PRODUCTION_PRAGMAS,
+    })
+
+
+if __name__ == '__main__':
+    main()
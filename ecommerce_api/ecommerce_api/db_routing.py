@@ -0,0 +1,139 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The read state of the request being handled; None outside a request that
+# may use a replica, so management commands and writes stay on the primary.
+_read_state = ContextVar('read_state', default=None)
+
+
+def get_cache():
+    return caches[settings.DATABASE_PIN_CACHE_ALIAS]
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send `user_id`'s reads to the primary for DATABASE_PRIMARY_PIN_SECONDS."""
+    if settings.DATABASE_PRIMARY_PIN_SECONDS:
+        get_cache().set(_pin_key(user_id), True, settings.DATABASE_PRIMARY_PIN_SECONDS)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the block's reads to the primary. For results shared beyond the
+    request, such as cached responses: one built from a lagging replica
+    would outlive the lag and reach users pinned to the primary.
+    """
+    token = _read_state.set(None)
+    try:
+        yield
+    finally:
+        _read_state.reset(token)
+
+
+class ReadState:
+    """The replica picked for one request, unless its user is pinned to the primary."""
+
+    def __init__(self, request, alias):
+        self.request = request
+        self.replica = alias
+        self.user_id = None
+        self.pinned = False
+
+    def alias(self):
+        # The user is known once DRF has authenticated the request; until
+        # then (and for anonymous requests) there is nothing to pin.
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated and user.pk != self.user_id:
+            self.user_id = user.pk
+            self.pinned = bool(get_cache().get(_pin_key(user.pk)))
+        return DEFAULT_DB_ALIAS if self.pinned else self.replica
+
+
+class ReplicaRouter:
+    """
+    Reads the models in DATABASE_REPLICA_MODELS from a replica during
+    GET/HEAD/OPTIONS requests (see ReplicaRoutingMiddleware); everything else,
+    writes, reads inside a transaction and reads by pinned users go to the
+    primary. Replicas hold the same tables, so relations across aliases are
+    allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _read_state.get()
+        if state is None or model._meta.label_lower not in settings.DATABASE_REPLICA_MODELS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets ReplicaRouter use a replica for safe-method requests, one replica
+    per request, and pins the user to the primary after a successful write,
+    so they read their own writes while the replicas catch up.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _read_state.set(self.read_state(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_state.reset(token)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _read_state.set(self.read_state(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_state.reset(token)
+        if request.method not in SAFE_METHODS:
+            await sync_to_async(self.pin)(request, response)
+        return response
+
+    @staticmethod
+    def read_state(request):
+        if request.method in SAFE_METHODS and settings.DATABASE_REPLICAS:
+            return ReadState(request, random.choice(settings.DATABASE_REPLICAS))
+        return None
+
+    @staticmethod
+    def pin(request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
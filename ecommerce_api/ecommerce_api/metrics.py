@@ -0,0 +1,218 @@
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('ecommerce_api.slow_requests')
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = 'unmatched'
+
+
+class RouteStats:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class Registry:
+    """
+    In-process request metrics keyed on (route name, method). Each worker
+    process keeps its own registry, so every worker has to be scraped and
+    the series summed in Prometheus.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+    def observe(self, route, method, status, seconds, queries, db_seconds, response_bytes):
+        with self.lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats()
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.queries += queries
+            stats.db_seconds += db_seconds
+            stats.response_bytes += response_bytes
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        families = {
+            'http_requests_total': ('counter', 'Requests handled, by route, method and status.', []),
+            'http_request_duration_seconds': ('histogram', 'Request latency.', []),
+            'http_request_db_queries_total': ('counter', 'SQL statements executed.', []),
+            'http_request_db_seconds_total': ('counter', 'Time spent executing SQL.', []),
+            'http_response_bytes_total': ('counter', 'Response body bytes, streaming responses excluded.', []),
+        }
+        with self.lock:
+            for (route, method), stats in sorted(self.routes.items()):
+                labels = f'route="{_escape(route)}",method="{method}"'
+                for status, count in sorted(stats.statuses.items()):
+                    families['http_requests_total'][2].append(f'{{{labels},status="{status}"}} {count}')
+                histogram = families['http_request_duration_seconds'][2]
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    histogram.append(f'_bucket{{{labels},le="{bound}"}} {cumulative}')
+                histogram.append(f'_sum{{{labels}}} {stats.seconds:.6f}')
+                histogram.append(f'_count{{{labels}}} {stats.count}')
+                families['http_request_db_queries_total'][2].append(f'{{{labels}}} {stats.queries}')
+                families['http_request_db_seconds_total'][2].append(f'{{{labels}}} {stats.db_seconds:.6f}')
+                families['http_response_bytes_total'][2].append(f'{{{labels}}} {stats.response_bytes}')
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{sample}' for sample in samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """
+    DB execute wrapper counting statements and their time. The SQL itself is
+    kept only when `keep_sql` is set, for the slow-request log.
+    """
+
+    def __init__(self, keep_sql=False):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_sql:
+                self.statements.append((elapsed, sql))
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL statement count and time, and response size for
+    every request under its resolved route name (`product-list`,
+    `order-cancel`, ...), and adds a `Server-Timing` header splitting the
+    time into db, app (view and serializers, less SQL), render and total.
+
+    With `METRICS_SLOW_REQUEST_MS` set, requests slower than that are
+    logged to `ecommerce_api.slow_requests` with their slowest statements.
+
+    Under ASGI the ORM runs in the request's worker thread, whose connections
+    are not the event loop's, so the wrappers are installed from there.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder, start = self.start(request)
+        with ExitStack() as stack:
+            self.install(stack, recorder)
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder, start = self.start(request)
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, start)
+
+    @staticmethod
+    def install(stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def start(self, request):
+        slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', None)
+        request._metrics_rendered_at = None
+        return QueryRecorder(keep_sql=slow_ms is not None), time.perf_counter()
+
+    def finish(self, request, response, recorder, start):
+        slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', None)
+        total = time.perf_counter() - start
+
+        view_end = request._metrics_rendered_at or start + total
+        render = start + total - view_end
+        app = max(total - render - recorder.seconds, 0.0)
+        if getattr(settings, 'METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={recorder.seconds * 1000:.2f};desc="{recorder.count} queries"',
+                f'app;dur={app * 1000:.2f}',
+                f'render;dur={render * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ])
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.url_name if match and match.url_name else UNMATCHED
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, total, recorder.count, recorder.seconds, size)
+        if slow_ms is not None and total * 1000 >= slow_ms:
+            self.log_slow_request(request, route, response, total, recorder)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; what follows is render time.
+        request._metrics_rendered_at = time.perf_counter()
+        return response
+
+    def log_slow_request(self, request, route, response, total, recorder):
+        limit = getattr(settings, 'METRICS_SLOW_REQUEST_STATEMENTS', 10)
+        slowest = sorted(recorder.statements, key=lambda item: item[0], reverse=True)[:limit]
+        logger.warning(
+            'Slow request %s %s (%s) -> %s in %.1f ms, %d queries, %.1f ms SQL\n%s',
+            request.method, request.get_full_path(), route, response.status_code, total * 1000,
+            recorder.count, recorder.seconds * 1000,
+            '\n'.join(f'  {elapsed * 1000:8.2f} ms  {sql}' for elapsed, sql in slowest),
+        )
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires `Bearer <METRICS_TOKEN>`, and is closed while that is unset."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,29 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+class AsyncURLConfMiddleware:
+    """
+    Routes requests through `ASYNC_ROOT_URLCONF` when the middleware chain
+    runs async (ASGI), so those requests reach the async read views. Under
+    WSGI it does nothing and ROOT_URLCONF keeps serving the sync views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        urlconf = getattr(settings, 'ASYNC_ROOT_URLCONF', None)
+        if urlconf:
+            request.urlconf = urlconf
+        return await self.get_response(request)
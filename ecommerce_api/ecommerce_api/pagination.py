@@ -0,0 +1,158 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor, _reverse_ordering
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on every column of the ordering, not just the first.
+
+    The ordering always ends with the primary key so each row has a unique
+    position, and a page is fetched with a `WHERE (a, b, pk) > (...)` style
+    filter instead of an OFFSET, so deep pages cost the same as the first one.
+    Views pick their ordering through `OrderingFilter` or an `ordering`
+    attribute.
+    """
+    ordering = '-pk'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(hasattr(backend, 'get_ordering') for backend in getattr(view, 'filter_backends', [])):
+            ordering = getattr(view, 'ordering', None) or ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in ('pk', pk_name) for field in ordering):
+            ordering += ('-pk' if ordering[0].startswith('-') else 'pk',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The unevaluated queryset of the requested page plus one look-ahead row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.pk_name = queryset.model._meta.pk.name
+        self.cursor = self.decode_cursor(request)
+        self.reverse = reverse = self.cursor.reverse if self.cursor else False
+
+        if queryset._fields:
+            # values() rows must carry every ordering column to build cursors.
+            missing = [name for name in (field.lstrip('-') for field in self.ordering)
+                       if name not in ('pk', self.pk_name) and name not in queryset._fields]
+            if missing:
+                queryset = queryset.values(*queryset._fields, *missing)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            position = self.parse_position(queryset, self.cursor.position)
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = self.cursor is not None, has_following
+        else:
+            self.has_next, self.has_previous = has_following, self.cursor is not None
+        return self.page
+
+    def keyset_filter(self, ordering, position):
+        """
+        Build `a >= x AND ((a > x) OR (a = x AND b > y) OR ...)` for the
+        given ordering, honouring the direction of each column. The leading
+        `a >= x` is implied by the rest but gives the database a range to
+        seek to in the ordering's index; the OR chain alone is walked from
+        the start of the index, as an OFFSET would be.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        field, value = ordering[0], position[0]
+        if value is None:
+            return condition
+        return Q(**{f"{field.lstrip('-')}__{'lte' if field.startswith('-') else 'gte'}": value}) & condition
+
+    def get_position(self, instance):
+        # Pages may hold model instances or values() dicts.
+        if isinstance(instance, dict):
+            names = [field.lstrip('-') for field in self.ordering]
+            return [str(instance[self.pk_name if name == 'pk' else name]) for name in names]
+        return [str(getattr(instance, field.lstrip('-'))) for field in self.ordering]
+
+    def parse_position(self, queryset, position):
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        opts = queryset.model._meta
+        values = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            if name in queryset.query.annotations:
+                output_field = queryset.query.annotations[name].output_field
+            else:
+                output_field = opts.pk if name == 'pk' else opts.get_field(name)
+            try:
+                values.append(output_field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            reverse = bool(tokens['r'])
+            position = [str(value) for value in tokens['p']]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'r': int(cursor.reverse), 'p': cursor.position}
+        encoded = urlsafe_b64encode(json.dumps(tokens, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ecommerce_api.metrics.RequestMetricsMiddleware',
+    'ecommerce_api.db_routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,10 +60,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'ecommerce_api.middleware.AsyncURLConfMiddleware',
   #  'axes.middleware.AxesMiddleware',
 ]
 
 ROOT_URLCONF = 'ecommerce_api.urls'
+# URLconf used for requests served under ASGI, where catalogue reads have
+# native async views; see ecommerce_api/middleware.py. None disables it.
+ASYNC_ROOT_URLCONF = 'ecommerce_api.urls_async'
 
 TEMPLATES = [
     {
@@ -92,6 +98,50 @@ DATABASES = {
     }
 }
 
+# Read replicas (ecommerce_api/db_routing.py). During GET/HEAD/OPTIONS
+# requests the models in DATABASE_REPLICA_MODELS are read from one of the
+# aliases in DATABASE_REPLICAS; orders, wishlists and auth stay on `default`.
+# After a write, the user's reads stay on `default` for
+# DATABASE_PRIMARY_PIN_SECONDS, which should exceed the replication lag.
+# Locally, DATABASE_REPLICA_NAME points a `replica` alias at a second SQLite
+# file (copy db.sqlite3 to it, or `migrate --database replica`); a
+# PostgreSQL replica is another entry in DATABASES with its alias listed here.
+DATABASE_ROUTERS = ['ecommerce_api.db_routing.ReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_MODELS = ['products.product', 'products.category', 'products.review', 'products.productimage']
+DATABASE_PRIMARY_PIN_SECONDS = 10
+DATABASE_PIN_CACHE_ALIAS = 'default'
+
+if os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DATABASE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
+# SQLite production profile (ecommerce_api/sqlite.py), on with
+# SQLITE_PRODUCTION=1. SQLITE_PRAGMAS are applied to every new connection:
+# WAL lets readers run while a write is in progress, synchronous=NORMAL is
+# durable across crashes of the process in WAL mode, and busy_timeout
+# (ms) bounds the wait for the write lock. IMMEDIATE transactions take
+# that lock up front instead of failing to upgrade a read lock half way.
+# SQLITE_SERIALIZE_WRITES queues order and wishlist writes in-process.
+SQLITE_PRAGMAS = {}
+SQLITE_SERIALIZE_WRITES = False
+
+if os.environ.get('SQLITE_PRODUCTION'):
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # KiB
+        'temp_store': 'MEMORY',
+    }
+    SQLITE_SERIALIZE_WRITES = True
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 5}
+
 
 
 # Password validation
@@ -142,14 +192,51 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'ecommerce_api.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache alias and lifetime (seconds) for cached product/category responses.
+# Use a shared backend (memcached, redis) when running several processes so
+# invalidations reach every worker.
+CATALOGUE_CACHE_ALIAS = 'default'
+CATALOGUE_CACHE_TIMEOUT = 300
+
+# Default price range boundaries of /products/facets/; `?price_buckets=`
+# overrides them per request.
+PRODUCT_FACET_PRICE_BUCKETS = [0, 25, 50, 100, 250, 500, 1000]
+
+# Cache alias and lifetime (seconds) for the user records behind JWT
+# authentication (users/authentication.py). Entries are dropped when a user
+# is saved; the timeout bounds staleness after queryset updates elsewhere.
+AUTH_PRINCIPAL_CACHE_ALIAS = 'default'
+AUTH_PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Pending orders (carts) whose lines have not changed for this long are
+# expired and their stock released by `manage.py expire_carts`.
+CART_EXPIRY_MINUTES = 60
+
+# Request metrics (ecommerce_api/metrics.py), scraped from /metrics with
+# `Authorization: Bearer <METRICS_TOKEN>`; without a token every scrape is
+# refused. Set METRICS_SLOW_REQUEST_MS to log the SQL of requests slower
+# than that.
+METRICS_SERVER_TIMING = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_SLOW_REQUEST_MS = None
+METRICS_SLOW_REQUEST_STATEMENTS = 10
+
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
@@ -0,0 +1,67 @@
+import threading
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver applying SQLITE_PRAGMAS to new SQLite connections."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class WriteQueue:
+    """
+    A first-come, first-served lock. SQLite takes one writer at a time and
+    a writer that loses the race sleeps and retries until busy_timeout, so
+    under contention requests are served out of order and some fail with
+    `database is locked`. Queueing the writes of this process in front of
+    the database hands the lock over in arrival order instead. Re-entrant
+    within a thread.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        self.local = threading.local()
+
+    def __enter__(self):
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        if depth:
+            return self
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.condition.wait_for(lambda: self.serving == ticket)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.local.depth -= 1
+        if self.local.depth:
+            return
+        with self.condition:
+            self.serving += 1
+            self.condition.notify_all()
+
+
+write_queue = WriteQueue()
+
+
+class SerializedWritesMixin:
+    """
+    Runs the view's unsafe-method requests one at a time through
+    `write_queue` when SQLITE_SERIALIZE_WRITES is set. Reads are never
+    queued; with WAL journaling they do not wait for the writer either.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS or not getattr(settings, 'SQLITE_SERIALIZE_WRITES', False):
+            return super().dispatch(request, *args, **kwargs)
+        with write_queue:
+            return super().dispatch(request, *args, **kwargs)
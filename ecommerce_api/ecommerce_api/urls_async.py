@@ -0,0 +1,10 @@
+"""
+URL configuration for requests served under ASGI.
+
+The same routes as ecommerce_api.urls, with product, category and review
+reads served by native async views (products/async_views.py).
+"""
+from products.async_views import async_urlpatterns
+from . import urls
+
+urlpatterns = async_urlpatterns(urls.urlpatterns)
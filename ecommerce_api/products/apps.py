@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from ecommerce_api.sqlite import configure_connection
+        from .search import install_search_index
+        post_migrate.connect(install_search_index, sender=self)
+        connection_created.connect(configure_connection)
@@ -0,0 +1,124 @@
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.urls import URLPattern, URLResolver
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+READ_ACTIONS = ('list', 'retrieve')
+
+
+class AsyncReadMixin:
+    """
+    Native async `list` and `retrieve` for a viewset, served when its route
+    is reached through the ASGI URLconf (ecommerce_api/urls_async.py).
+
+    `adispatch` mirrors APIView.dispatch: content negotiation, versioning,
+    permissions and throttles run inline, authentication runs in a worker
+    thread unless every authenticator is marked `async_safe`, and errors go
+    through `handle_exception` as usual. Mixins earlier in the MRO provide
+    `alist`/`aretrieve` twins of their `list`/`retrieve`; the versions here
+    are the fallbacks at the bottom of that chain. Writes are never routed
+    here and keep using the sync viewset.
+    """
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+        if all(getattr(authenticator, 'async_safe', False) for authenticator in request.authenticators):
+            self.perform_authentication(request)
+        else:
+            await sync_to_async(self.perform_authentication)(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def alist(self, request, *args, **kwargs):
+        return await sync_to_async(super().list)(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def afilter_queryset(self):
+        # Filter backends may query while validating their parameters (a
+        # ModelChoiceFilter looks its value up), so the queryset is built in
+        # a worker thread; only evaluating it happens in the event loop.
+        return await sync_to_async(lambda: self.filter_queryset(self.get_queryset()))()
+
+    async def aget_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = await self.afilter_queryset()
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+def async_read_view(sync_view):
+    """
+    An async view for the viewset route `sync_view` (a ViewSet.as_view()
+    callback) that serves GET and HEAD on read actions through
+    AsyncReadMixin.adispatch and hands every other request to `sync_view`.
+    """
+    cls, initkwargs, actions = sync_view.cls, sync_view.initkwargs, dict(sync_view.actions)
+    if 'get' in actions and 'head' not in actions:
+        actions['head'] = actions['get']
+
+    async def view(request, *args, **kwargs):
+        method = request.method.lower()
+        if actions.get(method) not in READ_ACTIONS:
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        self = cls(**initkwargs)
+        self.action_map = actions
+        for method, action in actions.items():
+            setattr(self, method, getattr(self, action))
+        self.request = request
+        return await self.adispatch(request, *args, **kwargs)
+
+    markcoroutinefunction(view)
+    view.cls = cls
+    view.initkwargs = initkwargs
+    view.actions = sync_view.actions
+    return csrf_exempt(view)
+
+
+def async_urlpatterns(patterns):
+    """
+    A copy of `patterns` in which every viewset route whose viewset has
+    AsyncReadMixin and maps a read action is served by async_read_view().
+    """
+    result = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern, async_urlpatterns(pattern.url_patterns), pattern.default_kwargs,
+                pattern.app_name, pattern.namespace,
+            )
+        else:
+            callback = pattern.callback
+            cls = getattr(callback, 'cls', None)
+            actions = getattr(callback, 'actions', None) or {}
+            if cls is not None and issubclass(cls, AsyncReadMixin) and set(actions.values()) & set(READ_ACTIONS):
+                pattern = URLPattern(pattern.pattern, async_read_view(callback), pattern.default_args, pattern.name)
+        result.append(pattern)
+    return result
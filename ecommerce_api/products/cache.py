@@ -0,0 +1,179 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework.response import Response
+from ecommerce_api.db_routing import primary_reads
+
+PREFIX = 'catalogue'
+
+
+def get_cache():
+    return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+
+def _generation_key(name):
+    return f'{PREFIX}:gen:{name}'
+
+
+def _bump(names):
+    cache = get_cache()
+    for name in names:
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate(*names):
+    """
+    Bump the generation counter of each named dependency, so every cached
+    response built from it stops matching. When called inside a transaction
+    the counters are bumped again on commit, so a response cached by a
+    concurrent request before the commit is not served afterwards.
+    """
+    _bump(names)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(names))
+
+
+def generations(names):
+    cache = get_cache()
+    keys = [_generation_key(name) for name in names]
+    values = cache.get_many(keys)
+    if len(values) < len(keys):
+        # Seed missing counters with a timestamp rather than 0 so an evicted
+        # counter can never come back at a value older entries were keyed on.
+        for key in keys:
+            if key not in values:
+                cache.add(key, time.time_ns(), None)
+        values = cache.get_many(keys)
+    return [values.get(key) for key in keys]
+
+
+async def agenerations(names):
+    cache = get_cache()
+    keys = [_generation_key(name) for name in names]
+    values = await cache.aget_many(keys)
+    if len(values) < len(keys):
+        for key in keys:
+            if key not in values:
+                await cache.aadd(key, time.time_ns(), None)
+        values = await cache.aget_many(keys)
+    return [values.get(key) for key in keys]
+
+
+def _record(outcome):
+    cache = get_cache()
+    key = f'{PREFIX}:stats:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+async def _arecord(outcome):
+    cache = get_cache()
+    key = f'{PREFIX}:stats:{outcome}'
+    if not await cache.aadd(key, 1, None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, None)
+
+
+def stats():
+    values = get_cache().get_many([f'{PREFIX}:stats:hits', f'{PREFIX}:stats:misses'])
+    hits = values.get(f'{PREFIX}:stats:hits', 0)
+    misses = values.get(f'{PREFIX}:stats:misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([f'{PREFIX}:stats:hits', f'{PREFIX}:stats:misses'])
+
+
+class CachedResponseMixin:
+    """
+    Caches the serialized data of successful `list` and `retrieve` responses.
+
+    Entries are keyed on the action, URL kwargs, host, normalized query
+    parameters and the current generation of every name in
+    `cache_dependencies`; see `invalidate()`. Misses are built from the
+    primary database, never a read replica. The `a`-prefixed methods are
+    the same for the async read path (products/async_views.py).
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, kwargs):
+        return self.build_response_cache_key(request, kwargs, generations(self.cache_dependencies))
+
+    async def aget_response_cache_key(self, request, kwargs):
+        return self.build_response_cache_key(request, kwargs, await agenerations(self.cache_dependencies))
+
+    def get_response_cache_params(self, request):
+        """The query parameters a cached response varies on; all of them by default."""
+        return sorted((key, value) for key, values in request.query_params.lists() for value in values)
+
+    def build_response_cache_key(self, request, kwargs, generations):
+        params = self.get_response_cache_params(request)
+        signature = repr((request.get_host(), sorted(kwargs.items()), params, generations))
+        digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()
+        return f'{PREFIX}:{self.basename}:{self.action}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_response_cache_key(request, kwargs)
+        data = cache.get(key)
+        if data is not None:
+            _record('hits')
+            return self.cache_hit(data)
+
+        _record('misses')
+        with primary_reads():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = await self.aget_response_cache_key(request, kwargs)
+        data = await cache.aget(key)
+        if data is not None:
+            await _arecord('hits')
+            return self.cache_hit(data)
+
+        await _arecord('misses')
+        with primary_reads():
+            response = await handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def cache_hit(data):
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
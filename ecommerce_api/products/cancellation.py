@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .inventory import release
+from .models import Order, OrderItem
+
+CANCEL_BATCH_SIZE = 500
+
+
+def filter_orders(queryset, ids=None, user=None, product=None, placed_after=None, placed_before=None):
+    """Narrow an Order queryset by the bulk-cancel filters; None means no filter."""
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if user is not None:
+        queryset = queryset.filter(user_id=user)
+    if product is not None:
+        queryset = queryset.filter(pk__in=OrderItem.objects.filter(product_id=product).values('order_id'))
+    if placed_after is not None:
+        queryset = queryset.filter(order_date__gte=placed_after)
+    if placed_before is not None:
+        queryset = queryset.filter(order_date__lt=placed_before)
+    return queryset
+
+
+def cancel_orders(queryset, batch_size=CANCEL_BATCH_SIZE):
+    """
+    Cancel the pending orders in `queryset` and put their stock back.
+
+    Orders are taken in primary-key batches of `batch_size`, each in its own
+    transaction: the batch's rows still matching `queryset` and pending are
+    locked, switched to Cancelled, and their lines restocked with one UPDATE
+    summed per product (see inventory.release). An order cancelled
+    concurrently by someone else is skipped, never restocked twice. Returns
+    counts of cancelled orders, restocked units and batches.
+    """
+    pending = queryset.filter(status='Pending').order_by('pk').values_list('pk', flat=True)
+    report = {'cancelled': 0, 'restocked_units': 0, 'batches': 0}
+    last_pk = None
+    while True:
+        batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+        ids = list(batch[:batch_size])
+        if not ids:
+            return report
+        last_pk = ids[-1]
+        closed, units = close_batch(pending, ids, 'Cancelled')
+        if closed:
+            report['cancelled'] += closed
+            report['restocked_units'] += units
+            report['batches'] += 1
+
+
+def close_batch(queryset, ids, status):
+    """
+    In one transaction, lock the orders of `ids` still matching `queryset`
+    and pending, set them to `status` and release their stock. Returns the
+    number of orders closed and of units released.
+    """
+    with transaction.atomic():
+        # Re-checked under the lock: the filter may depend on columns
+        # (last_activity) that changed since the batch was picked.
+        ids = list(queryset.select_for_update().filter(pk__in=ids, status='Pending').values_list('pk', flat=True))
+        if not ids:
+            return 0, 0
+        Order.objects.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+        quantities = dict(
+            OrderItem.objects.filter(order_id__in=ids).order_by().values('product_id')
+            .annotate(units=Sum('quantity')).values_list('product_id', 'units')
+        )
+        release(quantities)
+    return len(ids), sum(quantities.values())
@@ -0,0 +1,159 @@
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from ecommerce_api.db_routing import primary_reads
+from .cache import get_cache
+
+
+def _weak(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to `list` and `retrieve` responses and
+    answers `If-None-Match` / `If-Modified-Since` with 304 Not Modified.
+
+    The validators come from one aggregate query over the rows behind the
+    response: their count and the latest value of each field in
+    `conditional_timestamps`. Nothing is serialized, and a 304 is returned
+    before the page queryset is evaluated or a response is built. Related
+    rows that appear in the payload bump their parent's `updated_at`. Views
+    that also use CachedResponseMixin cache the aggregate under their
+    response cache key, so a repeated request costs no query at all.
+
+    Last-Modified cannot see deletions; the ETag, which includes the count,
+    does, and takes precedence when a client sends both. `alist` and
+    `aretrieve` do the same on the async read path.
+    """
+    conditional_timestamps = ('updated_at',)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.lookup_queryset(kwargs), super().retrieve, request, *args, single=True, **kwargs
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset()
+        return await self.aconditional_response(queryset, super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            await sync_to_async(self.lookup_queryset)(kwargs), super().aretrieve, request, *args, single=True,
+            **kwargs
+        )
+
+    def lookup_queryset(self, kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # As get_object_or_404() does for a malformed lookup value.
+            raise Http404
+
+    def validators_query(self, queryset):
+        aggregates = {f't{i}': Max(field) for i, field in enumerate(self.conditional_timestamps)}
+        return queryset.prefetch_related(None).order_by(), dict(count=Count('pk'), **aggregates)
+
+    def validators_row(self, row):
+        return row['count'], [row[f't{i}'] for i in range(len(self.conditional_timestamps))]
+
+    def aggregate_validators(self, request, queryset, kwargs):
+        key = None
+        if hasattr(self, 'get_response_cache_key'):
+            key = f'{self.get_response_cache_key(request, kwargs)}:validators'
+            row = get_cache().get(key)
+            if row is not None:
+                return row
+        queryset, aggregates = self.validators_query(queryset)
+        if key is None:
+            return self.validators_row(queryset.aggregate(**aggregates))
+        with primary_reads():  # cached, like the response it validates
+            row = self.validators_row(queryset.aggregate(**aggregates))
+        get_cache().set(key, row, settings.CATALOGUE_CACHE_TIMEOUT)
+        return row
+
+    async def aaggregate_validators(self, request, queryset, kwargs):
+        key = None
+        if hasattr(self, 'aget_response_cache_key'):
+            key = f'{await self.aget_response_cache_key(request, kwargs)}:validators'
+            row = await get_cache().aget(key)
+            if row is not None:
+                return row
+        queryset, aggregates = self.validators_query(queryset)
+        if key is None:
+            return self.validators_row(await queryset.aaggregate(**aggregates))
+        with primary_reads():
+            row = self.validators_row(await queryset.aaggregate(**aggregates))
+        await get_cache().aset(key, row, settings.CATALOGUE_CACHE_TIMEOUT)
+        return row
+
+    def get_validators(self, request, queryset, kwargs):
+        return self.build_validators(request, *self.aggregate_validators(request, queryset, kwargs))
+
+    async def aget_validators(self, request, queryset, kwargs):
+        return self.build_validators(request, *await self.aaggregate_validators(request, queryset, kwargs))
+
+    def build_validators(self, request, count, stamps):
+        """The ETag, Last-Modified and the count of rows they were built from."""
+        params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+        signature = repr((
+            request.path, params, request.headers.get('Accept', ''), count,
+            [stamp.isoformat() if stamp else None for stamp in stamps],
+        ))
+        etag = 'W/"%s"' % hashlib.sha1(signature.encode('utf-8')).hexdigest()
+        last_modified = max((stamp for stamp in stamps if stamp), default=None)
+        return etag, last_modified, count
+
+    def conditional_response(self, queryset, handler, request, *args, single=False, **kwargs):
+        """
+        Answer with 304 if the client's validators match, else call
+        `handler`. `single` marks a one-object response: without a row there
+        is no representation, so `If-None-Match: *` does not match.
+        """
+        etag, last_modified, count = self.get_validators(request, queryset, kwargs)
+        if self.not_modified(request, etag, last_modified, exists=count > 0 or not single):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.set_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, queryset, handler, request, *args, single=False, **kwargs):
+        etag, last_modified, count = await self.aget_validators(request, queryset, kwargs)
+        if self.not_modified(request, etag, last_modified, exists=count > 0 or not single):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.set_validators(response, etag, last_modified)
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, last_modified, exists=True):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            tags = {_weak(tag) for tag in parse_etags(if_none_match)}
+            return ('*' in tags and exists) or _weak(etag) in tags
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
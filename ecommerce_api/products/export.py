@@ -0,0 +1,92 @@
+import csv
+from datetime import datetime, time
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Product, Order, OrderItem, Review
+
+# dataset name -> (model, timestamp field used by `since`, exported columns)
+#
+# `since` keys on each row's own updated_at, so an incremental pull returns
+# rows created or changed after the cutoff: product edits, stock and rating
+# changes; order status changes (cancelled, expired) and total changes;
+# lines added to or re-quantified in an older cart; review edits. Deleted
+# rows are not reported; a removed order line shows up only as a change to
+# its order's totals.
+DATASETS = {
+    'products': (Product, 'updated_at', [
+        'id', 'sku', 'name', 'description', 'price', 'qnt', 'category_id', 'category__name', 'image_url',
+        'created_date', 'is_active', 'rating_avg', 'rating_count', 'updated_at',
+    ]),
+    'orders': (Order, 'updated_at', [
+        'id', 'user_id', 'order_date', 'status', 'total_amount', 'item_count', 'last_activity', 'updated_at',
+    ]),
+    'order-items': (OrderItem, 'updated_at', [
+        'id', 'order_id', 'order__user_id', 'order__order_date', 'order__status', 'product_id', 'quantity', 'price',
+        'updated_at',
+    ]),
+    'reviews': (Review, 'updated_at', [
+        'id', 'product_id', 'user_id', 'title', 'rating', 'comment', 'create_date', 'verif_purchase', 'updated_at',
+    ]),
+}
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def parse_since(value):
+    """Accept an ISO date or datetime; naive values are in the current time zone."""
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid 'since' value: {value!r}.")
+        since = datetime.combine(day, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_rows(dataset, since=None, chunk_size=2000):
+    """
+    Yield the dataset as dicts of plain column values, in primary key order.
+    Rows are read with a chunked iterator so memory stays flat regardless of
+    table size.
+    """
+    model, timestamp, columns = DATASETS[dataset]
+    queryset = model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(**{f'{timestamp}__gt': since})
+    return queryset.order_by('pk').values(*columns).iterator(chunk_size=chunk_size)
+
+
+def render_ndjson(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[column]) for column in columns])
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def render(dataset, output, since=None, chunk_size=2000):
+    rows = export_rows(dataset, since=since, chunk_size=chunk_size)
+    if output == 'csv':
+        return render_csv(rows, DATASETS[dataset][2])
+    return render_ndjson(rows)
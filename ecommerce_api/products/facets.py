@@ -0,0 +1,48 @@
+from django.db.models import Count, Q
+
+MAX_PRICE_BUCKETS = 20
+
+
+def price_bucket_ranges(boundaries):
+    """[(low, high), ...] for ascending `boundaries`; the last range is open-ended."""
+    return list(zip(boundaries, [*boundaries[1:], None]))
+
+
+def product_facets(queryset, boundaries):
+    """
+    Counts of the products in `queryset` per category, per price range
+    between `boundaries`, by is_active and by whether they are in stock.
+
+    Everything but the categories comes from one aggregate of conditional
+    counts (COUNT(*) FILTER (WHERE ...), or SUM(CASE ...) where FILTER is
+    not supported); the categories are one GROUP BY. A product priced below
+    the first boundary is in no price range.
+    """
+    queryset = queryset.prefetch_related(None).order_by()
+    ranges = price_bucket_ranges(boundaries)
+    aggregates = {
+        'count': Count('pk'),
+        'active': Count('pk', filter=Q(is_active=True)),
+        'in_stock': Count('pk', filter=Q(qnt__gt=0)),
+    }
+    for index, (low, high) in enumerate(ranges):
+        condition = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+        aggregates[f'price_{index}'] = Count('pk', filter=condition)
+    totals = queryset.aggregate(**aggregates)
+
+    categories = (
+        queryset.values('category', 'category__name').annotate(count=Count('pk')).order_by('-count', 'category')
+    )
+    return {
+        'count': totals['count'],
+        'categories': [
+            {'id': row['category'], 'name': row['category__name'], 'count': row['count']} for row in categories
+        ],
+        'price': [
+            # Strings, as prices are rendered.
+            {'min': str(low), 'max': None if high is None else str(high), 'count': totals[f'price_{index}']}
+            for index, (low, high) in enumerate(ranges)
+        ],
+        'is_active': {'true': totals['active'], 'false': totals['count'] - totals['active']},
+        'in_stock': {'true': totals['in_stock'], 'false': totals['count'] - totals['in_stock']},
+    }
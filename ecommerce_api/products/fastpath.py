@@ -0,0 +1,178 @@
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from rest_framework import serializers
+from rest_framework.response import Response
+from .models import Category, ProductImage, Review
+
+# Columns standing in for str(instance) of the StringRelatedFields below.
+# They must agree with the models' __str__ methods.
+PRODUCT_STRING_COLUMNS = {'category': 'category__name'}
+REVIEW_STRING_COLUMNS = {'user': 'user__username'}
+
+
+class RowPlan:
+    """
+    Renders values() rows exactly as `serializer` renders model instances.
+
+    Scalar fields are converted by the serializer's own field objects, so
+    formatting (decimals, time zones) is identical. StringRelatedFields are
+    read from the columns in `string_columns`. Fields named in `relations`
+    are filled by `builder(ids, field)`, which returns {row id: value} for a
+    whole page with one query; see Relation.
+    """
+
+    def __init__(self, serializer, string_columns=None, relations=None):
+        string_columns = string_columns or {}
+        relations = relations or {}
+        self.fields = []
+        self.columns = ['id']
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in relations:
+                self.fields.append((name, 'relation', relations[name], field))
+                continue
+            if name in string_columns:
+                kind, column = 'raw', string_columns[name]
+            elif isinstance(field, serializers.RelatedField):
+                kind, column = 'raw', field.source
+            else:
+                kind, column = 'value', field.source
+            self.fields.append((name, kind, column, field))
+            if column not in self.columns:
+                self.columns.append(column)
+
+    def render(self, rows):
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        related = {
+            name: builder(ids, field)
+            for name, kind, builder, field in self.fields if kind == 'relation'
+        }
+        return self.render_rows(rows, related)
+
+    async def arender(self, rows):
+        ids = [row['id'] for row in rows]
+        related = {}
+        for name, kind, builder, field in self.fields:
+            if kind == 'relation':
+                if isinstance(builder, Relation):
+                    related[name] = await builder.acall(ids, field)
+                else:
+                    related[name] = await sync_to_async(builder)(ids, field)
+        return self.render_rows(rows, related)
+
+    def render_rows(self, rows, related):
+        data = []
+        for row in rows:
+            item = {}
+            for name, kind, source, field in self.fields:
+                if kind == 'relation':
+                    item[name] = related[name].get(row['id'], [])
+                elif kind == 'raw':
+                    item[name] = row[source]
+                else:
+                    value = row[source]
+                    item[name] = None if value is None else field.to_representation(value)
+            data.append(item)
+        return data
+
+
+class Relation:
+    """
+    A RowPlan relation builder split into its query, `queryset(ids, field)`,
+    and the grouping of the fetched rows, `collect(rows, field)`, so the same
+    builder serves the sync and the async (`acall`) list paths.
+    """
+
+    def queryset(self, ids, field):
+        raise NotImplementedError
+
+    def collect(self, rows, field):
+        raise NotImplementedError
+
+    def __call__(self, ids, field):
+        return self.collect(list(self.queryset(ids, field)), field)
+
+    async def acall(self, ids, field):
+        return self.collect([row async for row in self.queryset(ids, field)], field)
+
+
+class ProductImageUrls(Relation):
+    def queryset(self, ids, field):
+        return ProductImage.objects.filter(product_id__in=ids).order_by('pk').values_list('product_id', 'image_url')
+
+    def collect(self, rows, field):
+        urls = defaultdict(list)
+        for product_id, url in rows:
+            urls[product_id].append(url)
+        return urls
+
+
+class ProductReviews(Relation):
+    def plan(self, field):
+        return RowPlan(field.child, string_columns=REVIEW_STRING_COLUMNS)
+
+    def queryset(self, ids, field):
+        return Review.objects.filter(product_id__in=ids).order_by('pk').values(*self.plan(field).columns, 'product')
+
+    def collect(self, rows, field):
+        reviews = defaultdict(list)
+        for row, review in zip(rows, self.plan(field).render(rows)):
+            reviews[row['product']].append(review)
+        return reviews
+
+
+class CategorySubcategoryNames(Relation):
+    def queryset(self, ids, field):
+        return Category.objects.filter(parent_cat_id__in=ids).order_by('pk').values_list('parent_cat_id', 'name')
+
+    def collect(self, rows, field):
+        names = defaultdict(list)
+        for parent_id, name in rows:
+            names[parent_id].append(name)
+        return names
+
+
+product_image_urls = ProductImageUrls()
+product_reviews = ProductReviews()
+category_subcategory_names = CategorySubcategoryNames()
+
+
+class FastListMixin:
+    """
+    Serves `list` from values() rows rendered by a RowPlan instead of
+    instantiating the serializer per object. Set `fast_list = False` to use
+    the regular serializer path.
+    """
+    fast_list = True
+    fast_string_columns = {}
+    fast_relations = {}
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+
+        plan, rows = self.fast_rows()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page))
+        return Response(plan.render(rows))
+
+    async def alist(self, request, *args, **kwargs):
+        if not self.fast_list:
+            return await super().alist(request, *args, **kwargs)
+
+        plan, rows = await sync_to_async(self.fast_rows)()  # see AsyncReadMixin.afilter_queryset
+        if self.paginator is not None:
+            if not hasattr(self.paginator, 'apaginate_queryset'):
+                return await sync_to_async(self.list)(request, *args, **kwargs)
+            page = await self.paginator.apaginate_queryset(rows, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(await plan.arender(page))
+        return Response(await plan.arender([row async for row in rows]))
+
+    def fast_rows(self):
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        plan = RowPlan(self.get_serializer(), self.fast_string_columns, self.fast_relations)
+        return plan, queryset.values(*plan.columns, *queryset.query.annotations)
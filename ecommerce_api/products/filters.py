@@ -1,12 +1,49 @@
+from django.db.models import Subquery, Value
+from django.db.models.functions import Concat, Length, Substr
 from django_filters import rest_framework as filters
-from .models import Product
+from rest_framework.filters import SearchFilter, OrderingFilter
+from .models import Product, Category
+from .search import get_search_backend
 
 class ProductFilter(filters.FilterSet):
     price_min = filters.NumberFilter(field_name="price", lookup_expr='gte')
     price_max = filters.NumberFilter(field_name="price", lookup_expr='lte')
     qnt_min = filters.NumberFilter(field_name="qnt", lookup_expr='gte')
     qnt_max = filters.NumberFilter(field_name="qnt", lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name="rating_avg", lookup_expr='gte')
+    category_tree = filters.NumberFilter(method='filter_category_tree')
 
     class Meta:
         model = Product
-        fields = ['category', 'is_active', 'price_min', 'price_max', 'qnt_min', 'qnt_max']
+        fields = ['category', 'is_active', 'price_min', 'price_max', 'qnt_min', 'qnt_max', 'rating_min', 'category_tree']
+
+    def filter_category_tree(self, queryset, name, value):
+        # Category.subtree_range() in SQL, so filtering runs no query of its
+        # own; an unknown category yields no rows.
+        path = Subquery(Category.objects.filter(pk=value).values('path')[:1])
+        end = Concat(Substr(path, 1, Length(path) - 1), Value(chr(ord('/') + 1)))
+        return queryset.filter(category__path__gte=path, category__path__lt=end)
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    `?search=` backed by the full-text index, ranked by relevance.
+    Falls back to SearchFilter's icontains matching on databases without
+    a search backend.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        backend = get_search_backend(queryset.db) if search_terms else None
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        return backend.search(queryset, search_terms)
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """Orders search results by relevance unless `?ordering=` is given."""
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,176 @@
+import csv
+import json
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .cache import invalidate
+from .models import Category, Product, ProductImage
+
+FORMATS = ('csv', 'ndjson')
+# Columns written on insert and on update of an existing SKU.
+PRODUCT_FIELDS = ['name', 'description', 'price', 'qnt', 'image_url', 'is_active']
+OPTIONAL_DEFAULTS = {'image_url': None, 'is_active': True}
+BOOLEAN_STRINGS = {'true': True, 'yes': True, '1': True, 'false': False, 'no': False, '0': False}
+
+
+def read_rows(stream, input_format):
+    """
+    Yield (row_number, dict) pairs from a text stream. CSV rows list extra
+    images in an `images` column separated by `|`; NDJSON rows may give
+    `images` as a list of URLs or of {"image_url", "alt_text"} objects.
+    """
+    if input_format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield number, {'__error__': f'Invalid JSON: {exc.msg}.'}
+
+
+def _clean_images(raw):
+    if raw in (None, ''):
+        return []
+    if isinstance(raw, str):
+        raw = [url for url in raw.split('|') if url.strip()]
+    field = ProductImage._meta.get_field('image_url')
+    images = {}
+    for image in raw:
+        if isinstance(image, str):
+            image = {'image_url': image}
+        url = field.clean(str(image.get('image_url', '')).strip(), None)
+        images[url] = image.get('alt_text') or None
+    return list(images.items())
+
+
+def clean_row(row):
+    """Validate one input row; return (cleaned, None) or (None, errors)."""
+    if not isinstance(row, dict):
+        return None, {'row': ['Expected an object.']}
+    if '__error__' in row:
+        return None, {'row': [row['__error__']]}
+
+    cleaned, errors = {}, {}
+    sku = str(row.get('sku') or '').strip()
+    max_length = Product._meta.get_field('sku').max_length
+    if not sku:
+        errors['sku'] = ['This field is required.']
+    elif len(sku) > max_length:
+        errors['sku'] = [f'Ensure this field has no more than {max_length} characters.']
+    cleaned['sku'] = sku
+
+    category = str(row.get('category') or '').strip()
+    if not category:
+        errors['category'] = ['This field is required.']
+    cleaned['category'] = category
+
+    for name in PRODUCT_FIELDS:
+        value = row.get(name)
+        if value in (None, '') and name in OPTIONAL_DEFAULTS:
+            cleaned[name] = OPTIONAL_DEFAULTS[name]
+            continue
+        if name == 'is_active' and isinstance(value, str):
+            value = BOOLEAN_STRINGS.get(value.strip().lower(), value)
+        try:
+            cleaned[name] = Product._meta.get_field(name).clean(value, None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+
+    try:
+        cleaned['images'] = _clean_images(row.get('images'))
+    except (ValidationError, AttributeError, TypeError) as exc:
+        errors['images'] = getattr(exc, 'messages', ['Invalid images.'])
+    return (None, errors) if errors else (cleaned, None)
+
+
+class ImportReport:
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def import_products(rows, batch_size=1000, max_errors=1000):
+    """
+    Upsert products (keyed on `sku`) and their images from (row_number, dict)
+    pairs, `batch_size` rows at a time. Each batch resolves categories with
+    one query and is written with two INSERT ... ON CONFLICT DO UPDATE
+    statements, one for products and one for images, in its own
+    transaction. Invalid rows are reported and skipped. At most
+    `max_errors` errors are returned, but every failure is counted.
+    """
+    report = ImportReport(max_errors)
+    batch = []
+    for number, row in rows:
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            _import_batch(batch, report)
+            batch = []
+    if batch:
+        _import_batch(batch, report)
+    if report.created or report.updated:
+        invalidate('product', 'productimage')
+    return report.as_dict()
+
+
+def _import_batch(batch, report):
+    valid = {}
+    for number, row in batch:
+        cleaned, errors = clean_row(row)
+        if errors:
+            report.error(number, errors)
+        else:
+            # A repeated SKU within a batch: the last row wins.
+            valid[cleaned['sku']] = (number, cleaned)
+
+    categories = dict(
+        Category.objects.filter(name__in={cleaned['category'] for _, cleaned in valid.values()})
+        .values_list('name', 'id')
+    )
+    for sku, (number, cleaned) in list(valid.items()):
+        if cleaned['category'] not in categories:
+            report.error(number, {'category': [f"Unknown category {cleaned['category']!r}."]})
+            del valid[sku]
+    if not valid:
+        return
+
+    with transaction.atomic():
+        existing = set(Product.objects.filter(sku__in=valid).values_list('sku', flat=True))
+        Product.objects.bulk_create(
+            [
+                Product(sku=sku, category_id=categories[cleaned['category']],
+                        **{name: cleaned[name] for name in PRODUCT_FIELDS})
+                for sku, (_, cleaned) in valid.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=PRODUCT_FIELDS + ['category', 'updated_at'],
+        )
+        product_ids = dict(Product.objects.filter(sku__in=valid).values_list('sku', 'id'))
+        ProductImage.objects.bulk_create(
+            [
+                ProductImage(product_id=product_ids[sku], image_url=url, alt_text=alt_text)
+                for sku, (_, cleaned) in valid.items()
+                for url, alt_text in cleaned['images']
+            ],
+            update_conflicts=True,
+            unique_fields=['product', 'image_url'],
+            update_fields=['alt_text', 'updated_at'],
+        )
+    report.updated += len(existing)
+    report.created += len(valid) - len(existing)
@@ -0,0 +1,99 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from .models import Product
+from .cache import invalidate
+
+RESERVE_ATTEMPTS = 3
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a reservation cannot be fulfilled. `failures` holds one dict
+    per short line: product_id, name, requested and available.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(self.messages())
+
+    def messages(self):
+        return [
+            f"Not enough stock for {failure['name']}. "
+            f"Available: {failure['available']}, Requested: {failure['requested']}"
+            for failure in self.failures
+        ]
+
+
+def group_quantities(lines):
+    """Sum (product_id, quantity) pairs into a {product_id: quantity} dict."""
+    quantities = defaultdict(int)
+    for product_id, quantity in lines:
+        quantities[product_id] += quantity
+    return dict(quantities)
+
+
+def _per_product(quantities):
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve(quantities):
+    """
+    Take stock for every product in `quantities` ({product_id: quantity}),
+    all or nothing.
+
+    The whole cart is reserved by a single conditional statement,
+    `UPDATE ... SET qnt = qnt - n WHERE id IN (...) AND qnt >= n`, so the stock
+    check and the decrement happen atomically in the database and concurrent
+    checkouts can never drive `qnt` below zero. If any line is short nothing
+    is taken and InsufficientStock reports every failing line.
+    """
+    if not quantities:
+        return
+    requested = _per_product(quantities)
+    for _ in range(RESERVE_ATTEMPTS):
+        with transaction.atomic():
+            updated = Product.objects.filter(pk__in=quantities, qnt__gte=requested).update(
+                qnt=F('qnt') - requested, updated_at=timezone.now())
+            if updated == len(quantities):
+                invalidate('product')
+                return
+            transaction.set_rollback(True)
+
+        failures = _shortages(quantities)
+        if failures:
+            raise InsufficientStock(failures)
+        # Stock was replenished between the update and the check; try again.
+    raise InsufficientStock(_shortages(quantities) or [
+        {'product_id': product_id, 'name': product_id, 'requested': quantity, 'available': None}
+        for product_id, quantity in quantities.items()
+    ])
+
+
+def _shortages(quantities):
+    stock = {row['id']: row for row in Product.objects.filter(pk__in=quantities).values('id', 'name', 'qnt')}
+    return [
+        {
+            'product_id': product_id,
+            'name': stock[product_id]['name'] if product_id in stock else product_id,
+            'requested': quantity,
+            'available': stock[product_id]['qnt'] if product_id in stock else 0,
+        }
+        for product_id, quantity in quantities.items()
+        if product_id not in stock or stock[product_id]['qnt'] < quantity
+    ]
+
+
+def release(quantities):
+    """Return stock for every product in `quantities` with a single UPDATE."""
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return 0
+    updated = Product.objects.filter(pk__in=quantities).update(
+        qnt=F('qnt') + _per_product(quantities), updated_at=timezone.now())
+    invalidate('product')
+    return updated
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from products.cancellation import CANCEL_BATCH_SIZE, cancel_orders, filter_orders
+from products.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Cancel every pending order matching the filters and restock their lines, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', type=int, nargs='+')
+        parser.add_argument('--user', type=int, help='User id.')
+        parser.add_argument('--product', type=int, help='Orders with a line for this product id.')
+        parser.add_argument('--placed-after', help='ISO datetime, inclusive.')
+        parser.add_argument('--placed-before', help='ISO datetime, exclusive.')
+        parser.add_argument('--batch-size', type=int, default=CANCEL_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the matching pending orders.')
+
+    def handle(self, *args, **options):
+        filters = {name: options[name] for name in ['ids', 'user', 'product']}
+        for name in ['placed_after', 'placed_before']:
+            if options[name] is not None:
+                filters[name] = parse_datetime(options[name])
+                if filters[name] is None:
+                    raise CommandError(f'--{name.replace("_", "-")}: expected an ISO datetime.')
+                if timezone.is_naive(filters[name]):
+                    filters[name] = timezone.make_aware(filters[name])
+        if all(value is None for value in filters.values()):
+            raise CommandError('Give at least one filter: --ids, --user, --product, --placed-after or --placed-before.')
+
+        orders = filter_orders(Order.objects.all(), **filters)
+        if options['dry_run']:
+            self.stdout.write(f"{orders.filter(status='Pending').count()} pending orders match.")
+            return
+        report = cancel_orders(orders, batch_size=max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f"Cancelled {report['cancelled']} orders in {report['batches']} batches, "
+            f"restocked {report['restocked_units']} units."
+        ))
@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from products.cancellation import CANCEL_BATCH_SIZE
+from products.sweeper import expire_idle_carts
+
+
+class Command(BaseCommand):
+    help = ('Expire pending orders idle for longer than CART_EXPIRY_MINUTES and release their stock. '
+            'Run it from cron, or with --loop as a worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-minutes', type=float, help='Idle time before a cart expires.')
+        parser.add_argument('--batch-size', type=int, default=CANCEL_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        ttl = timedelta(minutes=options['ttl_minutes']) if options['ttl_minutes'] is not None else None
+        while True:
+            report = expire_idle_carts(ttl, batch_size=max(options['batch_size'], 1))
+            self.stdout.write(
+                f"Expired {report['expired']} carts in {report['batches']} batches, released "
+                f"{report['restocked_units']} units in {report['seconds']}s "
+                f"({report['orders_per_second'] or 0} orders/s)."
+            )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from products import export
+
+
+class Command(BaseCommand):
+    help = 'Stream a dataset (products, orders, order-items, reviews) as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(export.DATASETS))
+        parser.add_argument('--output', choices=export.FORMATS, default='ndjson')
+        parser.add_argument('--since', help='Only rows created or updated after this ISO date/datetime.')
+        parser.add_argument('--file', help='Write to this path instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            since = export.parse_since(options['since'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        chunks = export.render(options['dataset'], options['output'], since=since, chunk_size=options['chunk_size'])
+        if options['file']:
+            with open(options['file'], 'w', newline='', encoding='utf-8') as fh:
+                fh.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
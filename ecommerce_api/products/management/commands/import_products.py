@@ -0,0 +1,38 @@
+import os
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from products import importer
+
+
+class Command(BaseCommand):
+    help = 'Upsert products and their images from a CSV or NDJSON feed, keyed on sku.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, or '-' for stdin.")
+        parser.add_argument('--input', choices=importer.FORMATS, help='Defaults to the file extension; required for stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-errors', type=int, default=1000, help='Maximum number of row errors to print.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['input'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if input_format not in importer.FORMATS:
+            # As the upload view does, rather than guessing.
+            raise CommandError(f"Cannot tell the format of {path!r}; pass --input {' or '.join(importer.FORMATS)}.")
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            report = importer.import_products(
+                importer.read_rows(stream, input_format),
+                batch_size=options['batch_size'],
+                max_errors=options['max_errors'],
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, failed {report['failed']}."
+        ))
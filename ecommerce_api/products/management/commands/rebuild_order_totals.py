@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.order_totals import rebuild_order_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute total_amount and item_count for every order from its lines.'
+
+    def handle(self, *args, **options):
+        updated = rebuild_order_totals()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt totals for {updated} orders.'))
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:38
+
+import products.models
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_rating_stats(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+    stars = range(1, 6)
+    rows = Review.objects.values("product").annotate(
+        **{f"r{star}": Count("id", filter=Q(rating=star)) for star in stars}
+    )
+    for row in rows:
+        histogram = {str(star): row[f"r{star}"] for star in stars}
+        count = sum(histogram.values())
+        total = sum(star * row[f"r{star}"] for star in stars)
+        Product.objects.filter(pk=row["product"]).update(
+            rating_histogram=histogram,
+            rating_count=count,
+            rating_avg=(Decimal(total) / count).quantize(Decimal("0.01")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_alter_review_rating_productimage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.DecimalField(
+                db_index=True, decimal_places=2, default=0, max_digits=3
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_histogram",
+            field=models.JSONField(default=products.models.empty_rating_histogram),
+        ),
+        migrations.RunPython(populate_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:52
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from products.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection.alias)
+    if backend is not None:
+        backend.install()
+        backend.rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    from products.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection.alias)
+    if backend is not None:
+        backend.uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_rating_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    parents = dict(Category.objects.values_list("id", "parent_cat_id"))
+    paths = {}
+
+    def path_of(pk, seen=()):
+        if pk not in paths:
+            parent = parents[pk]
+            if parent is None or parent in seen:
+                paths[pk] = f"/{pk}/"
+            else:
+                paths[pk] = f"{path_of(parent, seen + (pk,))}{pk}/"
+        return paths[pk]
+
+    categories = []
+    for pk in parents:
+        categories.append(Category(pk=pk, path=path_of(pk)))
+    Category.objects.bulk_update(categories, ["path"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_product_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
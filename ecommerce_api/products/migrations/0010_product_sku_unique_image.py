@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:48
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_images(apps, schema_editor):
+    ProductImage = apps.get_model("products", "ProductImage")
+    keep = ProductImage.objects.values("product", "image_url").annotate(keep=Min("id"))
+    ProductImage.objects.exclude(id__in=keep.values("keep")).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_category_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="sku",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(remove_duplicate_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="productimage",
+            constraint=models.UniqueConstraint(
+                fields=("product", "image_url"), name="unique_product_image_url"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_from_creation(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+    Product.objects.update(updated_at=models.F("created_date"))
+    Review.objects.update(updated_at=models.F("create_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_product_sku_unique_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_from_creation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_wishlist_items(apps, schema_editor):
+    WishlistItem = apps.get_model("products", "WishlistItem")
+    keep = WishlistItem.objects.values("wishlist", "product").annotate(keep=Min("id"))
+    WishlistItem.objects.exclude(id__in=keep.values("keep")).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["user", "status"], name="order_user_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("status", "Pending")),
+                fields=["user", "id"],
+                name="order_user_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "is_active"], name="product_category_active_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["created_date", "id"], name="product_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["price", "id"], name="product_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["qnt", "id"], name="product_qnt_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "created_date", "id"],
+                name="product_active_category_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["product", "id"], name="review_product_idx"),
+        ),
+        migrations.RunPython(
+            remove_duplicate_wishlist_items, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="wishlistitem",
+            constraint=models.UniqueConstraint(
+                fields=("wishlist", "product"), name="unique_wishlist_product"
+            ),
+        ),
+        # The composite indexes above now cover these foreign keys.
+        migrations.AlterField(
+            model_name="product",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="products",
+                to="products.category",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="review",
+            name="product",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reviews",
+                to="products.product",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="wishlistitem",
+            name="wishlist",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="items",
+                to="products.wishlist",
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:19
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model("products", "Order")
+    OrderItem = apps.get_model("products", "OrderItem")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def line_sum(expression, output_field):
+        lines = (
+            OrderItem.objects.filter(order=models.OuterRef("pk"))
+            .order_by()
+            .values("order")
+            .annotate(total=models.Sum(expression, output_field=output_field))
+            .values("total")
+        )
+        return Coalesce(
+            models.Subquery(lines), models.Value(0), output_field=output_field
+        )
+
+    Order.objects.update(
+        total_amount=line_sum(models.F("price") * models.F("quantity"), amount),
+        item_count=line_sum(models.F("quantity"), models.IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0012_api_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_amount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
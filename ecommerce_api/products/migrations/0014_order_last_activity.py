@@ -0,0 +1,50 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:23
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_from_order_date(apps, schema_editor):
+    Order = apps.get_model("products", "Order")
+    Order.objects.update(last_activity=models.F("order_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0013_order_totals"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="last_activity",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_from_order_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("Pending", "Pending"),
+                    ("Processing", "Processing"),
+                    ("Completed", "Completed"),
+                    ("Cancelled", "Cancelled"),
+                    ("Expired", "Expired"),
+                ],
+                default="Pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("status", "Pending")),
+                fields=["last_activity", "id"],
+                name="order_pending_activity_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:48
+
+import products.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0014_order_last_activity"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="category",
+            name="path",
+            field=products.models.BinaryCharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_from_activity(apps, schema_editor):
+    Order = apps.get_model("products", "Order")
+    OrderItem = apps.get_model("products", "OrderItem")
+    Order.objects.update(updated_at=models.F("last_activity"))
+    OrderItem.objects.update(
+        updated_at=models.Subquery(
+            Order.objects.filter(pk=models.OuterRef("order_id")).values(
+                "last_activity"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0015_category_path_binary_collation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_from_activity, migrations.RunPython.noop),
+    ]
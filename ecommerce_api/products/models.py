@@ -1,6 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Prefetch, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+
+
+class BinaryCharField(models.CharField):
+    """
+    A CharField compared byte by byte on every backend, so range lookups
+    follow code-point order. SQLite already compares that way; PostgreSQL
+    and MySQL locale collations do not (they may skip punctuation such as
+    '/'), which would break Category.subtree_range().
+    """
+    collations = {'postgresql': 'C', 'mysql': 'utf8mb4_bin', 'oracle': 'BINARY'}
+
+    def db_parameters(self, connection):
+        params = super().db_parameters(connection)
+        params['collation'] = self.collations.get(connection.vendor, params['collation'])
+        return params
 
 
 class Category(models.Model):
@@ -12,12 +30,82 @@ class Category(models.Model):
         blank=True,
         related_name='subcategories'
     )
+    # Materialized path of primary keys from the root down to this node,
+    # e.g. "/1/5/9/". A subtree is the contiguous range [path, subtree_end)
+    # in byte order, hence the binary collation.
+    path = BinaryCharField(max_length=255, default='', db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def subtree_range(path):
+        return path, path[:-1] + chr(ord('/') + 1)
+
+    def descendants(self, include_self=True):
+        start, end = self.subtree_range(self.path)
+        queryset = Category.objects.filter(path__gte=start, path__lt=end)
+        return queryset if include_self else queryset.exclude(pk=self.pk)
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        old_path, old_parent = '', None
+        if self.pk and not self._state.adding:
+            old_path, old_parent = Category.objects.filter(pk=self.pk).values_list(
+                'path', 'parent_cat_id').first() or ('', None)
+        parent_path = '/'
+        if self.parent_cat_id:
+            parent_path = Category.objects.values_list('path', flat=True).get(pk=self.parent_cat_id)
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError('A category cannot be moved under itself or one of its descendants.')
+
+        super().save(*args, **kwargs)
+        self.path = f'{parent_path}{self.pk}/'
+        if self.path != old_path:
+            Category.objects.filter(pk=self.pk).update(path=self.path)
+            if old_path:
+                self.move_subtree(old_path, self.path)
+        # Parents list their subcategories' names, so they change with them.
+        self.touch({old_parent, self.parent_cat_id} - {None})
+
+    @classmethod
+    def touch(cls, pks):
+        if pks:
+            cls.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+    @classmethod
+    def move_subtree(cls, old_path, new_path):
+        """Rewrite the path prefix of every strict descendant in one UPDATE."""
+        start, end = cls.subtree_range(old_path)
+        cls.objects.filter(path__gt=start, path__lt=end).update(
+            path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+        )
+
+
+def empty_rating_histogram():
+    return {str(star): 0 for star in range(1, 6)}
+
+
+def product_prefetches(prefix='', reviews=True, images=True):
+    """Prefetch lookups for a product's reviews and images, reached through `prefix`."""
+    lookups = []
+    if reviews:
+        lookups.append(Prefetch(f'{prefix}reviews', queryset=Review.objects.select_related('user')))
+    if images:
+        lookups.append(f'{prefix}images')
+    return lookups
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_related(self, reviews=True, images=True):
+        return self.select_related('category').prefetch_related(
+            *product_prefetches(reviews=reviews, images=images)
+        )
+
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -25,11 +113,31 @@ class Product(models.Model):
     category = models.ForeignKey(
         Category,
         on_delete=models.CASCADE,
-        related_name='products'
+        related_name='products',
+        db_index=False,  # covered by product_category_active_idx
     )
     image_url = models.URLField(max_length=255, blank=True, null=True)
     created_date = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, db_index=True)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_histogram = models.JSONField(default=empty_rating_histogram)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Orderings end with the primary key (see KeysetPagination), so the
+        # sort indexes do too.
+        indexes = [
+            models.Index(fields=['category', 'is_active'], name='product_category_active_idx'),
+            models.Index(fields=['created_date', 'id'], name='product_created_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['qnt', 'id'], name='product_qnt_idx'),
+            # Category pages of active products, in the default order.
+            models.Index(fields=['category', 'created_date', 'id'], condition=Q(is_active=True),
+                         name='product_active_category_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -45,13 +153,20 @@ class Review(models.Model):
     product = models.ForeignKey(
         Product,
         on_delete=models.CASCADE,
-        related_name='reviews'
+        related_name='reviews',
+        db_index=False,  # covered by review_product_idx
     )
     title = models.CharField(max_length=255, null=True, blank=True)
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(null=True, blank=True)
     create_date = models.DateTimeField(auto_now_add=True)
     verif_purchase = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'id'], name='review_product_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
@@ -70,7 +185,8 @@ class WishlistItem(models.Model):
     wishlist = models.ForeignKey(
         Wishlist,
         on_delete=models.CASCADE,
-        related_name='items'
+        related_name='items',
+        db_index=False,  # covered by unique_wishlist_product
     )
     product = models.ForeignKey(
         Product,
@@ -78,6 +194,11 @@ class WishlistItem(models.Model):
     )
     date_added = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wishlist', 'product'], name='unique_wishlist_product'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} in {self.wishlist.user.username}'s Wishlist"
 
@@ -87,6 +208,7 @@ class Order(models.Model):
         ('Processing', 'Processing'),
         ('Completed', 'Completed'),
         ('Cancelled', 'Cancelled'),
+        ('Expired', 'Expired'),
     ]
 
     user = models.ForeignKey(
@@ -96,6 +218,23 @@ class Order(models.Model):
     )
     order_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    # Sum of price * quantity and of quantity over the order's lines, kept
+    # current by products.order_totals.
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    # Last change to the order's lines; pending orders idle for longer than
+    # CART_EXPIRY_MINUTES are expired by products.sweeper.
+    last_activity = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+            # The open cart looked up on every order create.
+            models.Index(fields=['user', 'id'], condition=Q(status='Pending'), name='order_user_pending_idx'),
+            # Idle carts, scanned by the sweeper.
+            models.Index(fields=['last_activity', 'id'], condition=Q(status='Pending'), name='order_pending_activity_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} by {self.user.username}"
@@ -113,6 +252,7 @@ class OrderItem(models.Model):
     )
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.product.name} (x{self.quantity}) in Order #{self.order.id}"
@@ -125,6 +265,12 @@ class ProductImage(models.Model):
     )
     image_url = models.URLField(max_length=500)
     alt_text = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'image_url'], name='unique_product_image_url'),
+        ]
 
     def __str__(self):
         return f"Image for {self.product.name}"
@@ -0,0 +1,65 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Order, OrderItem
+
+
+def line_totals(lines):
+    """(amount, count) of (price, quantity) pairs."""
+    amount, count = Decimal('0.00'), 0
+    for price, quantity in lines:
+        amount += price * quantity
+        count += quantity
+    return amount, count
+
+
+def apply_order_change(order_id, amount, count):
+    """
+    Add `amount` and `count` (negative to subtract) to an order's totals
+    and mark it active. The increment happens in the database, so concurrent
+    changes to the same order add up instead of overwriting each other.
+    """
+    now = timezone.now()
+    Order.objects.filter(pk=order_id).update(
+        total_amount=F('total_amount') + amount, item_count=F('item_count') + count,
+        last_activity=now, updated_at=now,
+    )
+
+
+def remove_product_lines(product_id):
+    """
+    Subtract the lines of `product_id` from their orders' totals, before the
+    product's deletion cascades to them. The orders are not marked active.
+    """
+    amount = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    rows = (OrderItem.objects.filter(product_id=product_id).order_by().values('order')
+            .annotate(amount=Sum(amount), count=Sum('quantity')))
+    now = timezone.now()
+    for row in rows:
+        Order.objects.filter(pk=row['order']).update(
+            total_amount=F('total_amount') - row['amount'], item_count=F('item_count') - row['count'],
+            updated_at=now,
+        )
+
+
+def _line_sum(expression, output_field):
+    return Coalesce(
+        Subquery(
+            OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+            .annotate(total=Sum(expression, output_field=output_field)).values('total')
+        ),
+        Value(0),
+        output_field=output_field,
+    )
+
+
+@transaction.atomic
+def rebuild_order_totals():
+    """Recompute total_amount and item_count of every order from its lines; returns the order count."""
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    return Order.objects.update(
+        total_amount=_line_sum(ExpressionWrapper(F('price') * F('quantity'), output_field=amount), amount),
+        item_count=_line_sum(F('quantity'), IntegerField()),
+    )
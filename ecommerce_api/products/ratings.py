@@ -0,0 +1,77 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Product, Review, empty_rating_histogram
+from .cache import invalidate
+
+STARS = range(1, 6)
+
+
+def summarize_histogram(histogram):
+    count = sum(histogram.values())
+    if not count:
+        return 0, Decimal('0.00')
+    total = sum(int(star) * n for star, n in histogram.items())
+    return count, (Decimal(total) / count).quantize(Decimal('0.01'))
+
+
+def lock_ratings(product_id):
+    """
+    Take the product row lock that apply_rating_change takes, ahead of reading
+    the stored rating it is about to move.
+    """
+    Product.objects.select_for_update().filter(pk=product_id).exists()
+
+
+@transaction.atomic
+def apply_rating_change(product_id, added=None, removed=None):
+    """
+    Move one review in or out of a product's rating histogram.
+
+    The product row is locked for the duration of the caller's transaction,
+    so concurrent review writes for the same product are applied one after
+    the other instead of overwriting each other.
+    """
+    product = Product.objects.select_for_update().only('id', 'rating_histogram').get(pk=product_id)
+    histogram = {**empty_rating_histogram(), **product.rating_histogram}
+    if removed is not None:
+        histogram[str(removed)] = max(histogram[str(removed)] - 1, 0)
+    if added is not None:
+        histogram[str(added)] += 1
+    count, avg = summarize_histogram(histogram)
+    Product.objects.filter(pk=product_id).update(
+        rating_histogram=histogram, rating_count=count, rating_avg=avg, updated_at=timezone.now()
+    )
+
+
+@transaction.atomic
+def rebuild_rating_stats(batch_size=1000):
+    """
+    Recompute the rating columns of every product from its reviews.
+    Returns the number of products that have at least one review.
+    """
+    invalidate('product')
+    Product.objects.update(rating_histogram=empty_rating_histogram(), rating_count=0, rating_avg=0,
+                           updated_at=timezone.now())
+
+    rows = Review.objects.values('product').annotate(
+        **{f'r{star}': Count('id', filter=Q(rating=star)) for star in STARS}
+    ).order_by('product')
+
+    updated = 0
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        histogram = {str(star): row[f'r{star}'] for star in STARS}
+        count, avg = summarize_histogram(histogram)
+        batch.append(Product(pk=row['product'], rating_histogram=histogram, rating_count=count, rating_avg=avg))
+        if len(batch) >= batch_size:
+            updated += _flush(batch, batch_size)
+    return updated + _flush(batch, batch_size)
+
+
+def _flush(batch, batch_size):
+    Product.objects.bulk_update(batch, ['rating_histogram', 'rating_count', 'rating_avg'], batch_size=batch_size)
+    flushed = len(batch)
+    batch.clear()
+    return flushed
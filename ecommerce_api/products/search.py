@@ -0,0 +1,157 @@
+import re
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from .models import Product
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+INDEX_MIGRATION = '0008_product_search_index'
+
+
+class SearchBackend:
+    """
+    Full-text index over Product.name and Product.description.
+
+    Each backend owns the database objects backing the index, keeps them in
+    sync at the database level (so bulk writes are covered too) and turns
+    search terms into a filtered queryset annotated with `search_rank`,
+    where a higher rank means a better match.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.table = connection.ops.quote_name(Product._meta.db_table)
+
+    def install(self):
+        raise NotImplementedError
+
+    def uninstall(self):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, queryset, terms):
+        raise NotImplementedError
+
+    def execute(self, *statements):
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    @staticmethod
+    def tokenize(terms):
+        return [token.lower() for term in terms for token in TOKEN_RE.findall(term)]
+
+
+class SqliteSearchBackend(SearchBackend):
+    """FTS5 external-content table over products_product, maintained by triggers."""
+    fts_table = 'products_product_fts'
+
+    def install(self):
+        fts, table = self.fts_table, self.table
+        self.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"name, description, content={table}, content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name, description ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); "
+            f"INSERT INTO {fts}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        )
+
+    def uninstall(self):
+        fts = self.fts_table
+        self.execute(
+            f'DROP TRIGGER IF EXISTS {fts}_ai',
+            f'DROP TRIGGER IF EXISTS {fts}_ad',
+            f'DROP TRIGGER IF EXISTS {fts}_au',
+            f'DROP TABLE IF EXISTS {fts}',
+        )
+
+    def rebuild(self):
+        self.execute(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')")
+
+    def search(self, queryset, terms):
+        tokens = self.tokenize(terms)
+        if not tokens:
+            return queryset
+        fts, table = self.fts_table, self.table
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [query])
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({fts}, 10.0, 1.0) FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id',
+            [query], output_field=FloatField(),
+        ))
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted tsvector generated column with a GIN index."""
+    column = 'search_vector'
+    index = 'products_product_search_vector_idx'
+
+    def install(self):
+        self.execute(
+            f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS {self.column} tsvector "
+            f"GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+            f"CREATE INDEX IF NOT EXISTS {self.index} ON {self.table} USING GIN ({self.column})",
+        )
+
+    def uninstall(self):
+        self.execute(
+            f'DROP INDEX IF EXISTS {self.index}',
+            f'ALTER TABLE {self.table} DROP COLUMN IF EXISTS {self.column}',
+        )
+
+    def rebuild(self):
+        self.execute(f'REINDEX INDEX {self.index}')
+
+    def search(self, queryset, terms):
+        tokens = self.tokenize(terms)
+        if not tokens:
+            return queryset
+        vector = f'{self.table}.{self.column}'
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(
+            RawSQL(f"{vector} @@ to_tsquery('english', %s)", [query], output_field=BooleanField())
+        ).annotate(search_rank=RawSQL(
+            f"ts_rank({vector}, to_tsquery('english', %s))", [query], output_field=FloatField(),
+        ))
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    """
+    Return the full-text backend for a database alias, or None when the
+    database has no supported full-text engine (callers fall back to
+    icontains matching).
+    """
+    connection = connections[using]
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    return backend_class(connection) if backend_class else None
+
+
+def install_search_index(using='default', **kwargs):
+    """
+    post_migrate hook. SQLite drops triggers whenever a migration rebuilds
+    the products table, so they are recreated once migrations have run.
+    """
+    backend = get_search_backend(using)
+    if backend is None:
+        return
+    applied = MigrationRecorder(connections[using]).applied_migrations()
+    if ('products', INDEX_MIGRATION) in applied:
+        backend.install()
@@ -1,6 +1,89 @@
-from rest_framework import serializers
+from decimal import Decimal, InvalidOperation
+from rest_framework import serializers, permissions
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from .models import Product, Category, Review, WishlistItem, Wishlist, Order, OrderItem, ProductImage
+from .inventory import InsufficientStock, group_quantities, reserve
+from .order_totals import apply_order_change, line_totals
+from .facets import MAX_PRICE_BUCKETS
+
+
+def query_param_set(request, name):
+    value = request.query_params.get(name) if request is not None else None
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+def requested_fields(request, path):
+    """
+    Field names selected with `?fields=` for the serializer at `path`
+    (dotted, '' for the top level), or None if that level is not restricted.
+    """
+    requested = query_param_set(request, 'fields')
+    if not requested:
+        return None
+    prefix = f'{path}.' if path else ''
+    selected = {entry[len(prefix):].split('.')[0] for entry in requested if entry.startswith(prefix)}
+    return selected or None
+
+
+def expanded_relations(request, path, expandable_fields):
+    """
+    Names from `expandable_fields` to embed at `path`. A relation is embedded
+    when listed in `?expand=` or named in the `?fields=` selection for that
+    level. With neither parameter applying, a top-level serializer embeds all
+    of them and a nested one none.
+    """
+    requested = query_param_set(request, 'expand')
+    selected = requested_fields(request, path)
+    expanded = set()
+    for name, field_name in expandable_fields.items():
+        if requested is not None and name in requested:
+            expanded.add(name)
+        elif selected is not None:
+            if field_name in selected or name in selected:
+                expanded.add(name)
+        elif requested is None and not path:
+            expanded.add(name)
+    return expanded
+
+
+class SparseFieldsetMixin:
+    """
+    Read-side `?fields=` and `?expand=` support, see requested_fields() and
+    expanded_relations(). `expandable_fields` maps expansion names to the
+    serializer fields they control. Writes always use the full field set.
+    """
+    expandable_fields = {}
+
+    def field_path(self):
+        names, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return fields
+
+        path = self.field_path()
+        expanded = expanded_relations(request, path, self.expandable_fields)
+        for name, field_name in self.expandable_fields.items():
+            if name not in expanded:
+                fields.pop(field_name, None)
+        selected = requested_fields(request, path)
+        if selected is not None:
+            for field_name in list(fields):
+                if field_name not in selected and field_name not in self.expandable_fields.values():
+                    fields.pop(field_name)
+        return fields
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -15,7 +98,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'product', 'create_date', 'verif_purchase']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = serializers.StringRelatedField()
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
@@ -24,14 +107,17 @@ class ProductSerializer(serializers.ModelSerializer):
     )
     image_url = serializers.SerializerMethodField()
     reviews = ReviewSerializer(many=True, read_only=True)
+    expandable_fields = {'reviews': 'reviews', 'images': 'image_url'}
 
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'description', 'price', 'qnt', 'category',
-            'category_id', 'image_url', 'created_date', 'is_active', 'reviews'
+            'id', 'sku', 'name', 'description', 'price', 'qnt', 'category',
+            'category_id', 'image_url', 'created_date', 'updated_at', 'is_active',
+            'rating_avg', 'rating_count', 'rating_histogram', 'reviews'
         ]
-        read_only_fields = ['id', 'created_date','image_url' , 'reviews']
+        read_only_fields = ['id', 'created_date', 'updated_at', 'image_url' , 'reviews',
+                            'rating_avg', 'rating_count', 'rating_histogram']
 
     def get_image_url(self, obj):
         images = obj.images.all()
@@ -48,8 +134,14 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'parent_cat', 'subcategories']
 
+    def validate_parent_cat(self, value):
+        if value and self.instance and self.instance.path and value.path.startswith(self.instance.path):
+            raise serializers.ValidationError('A category cannot be moved under itself or one of its descendants.')
+        return value
+
 
-class WishlistItemSerializer(serializers.ModelSerializer):
+
+class WishlistItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
@@ -62,7 +154,27 @@ class WishlistItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_id', 'date_added']
 
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistCardSerializer(serializers.Serializer):
+    """A compact wishlist entry, rendered from WishlistViewSet.card_rows() dicts."""
+    product_id = serializers.IntegerField()
+    name = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    image_url = serializers.CharField(allow_null=True)
+    is_active = serializers.BooleanField()
+    in_stock = serializers.BooleanField()
+    date_added = serializers.DateTimeField()
+
+
+class WishlistBatchSerializer(serializers.Serializer):
+    product_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
+
+    def validate_product_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class WishlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = WishlistItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -71,7 +183,7 @@ class WishlistSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'items']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
@@ -86,13 +198,13 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'order', 'product', 'price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     
     class Meta:
         model = Order
-        fields = ['id', 'user', 'order_date', 'status', 'items']
-        read_only_fields = ['id', 'user', 'order_date', 'status']
+        fields = ['id', 'user', 'order_date', 'status', 'total_amount', 'item_count', 'items']
+        read_only_fields = ['id', 'user', 'order_date', 'status', 'total_amount', 'item_count']
     
     @transaction.atomic
     def create(self, validated_data):
@@ -105,6 +217,7 @@ class OrderSerializer(serializers.ModelSerializer):
         else:
             order = Order.objects.create(user=user, status='Pending')
             self.update_items(order, items_data)
+            order.refresh_from_db(fields=['total_amount', 'item_count'])
             return order
     
     @transaction.atomic
@@ -112,37 +225,90 @@ class OrderSerializer(serializers.ModelSerializer):
         items_data = validated_data.get('items')
         if items_data:
             self.update_items(instance, items_data)
-        instance.save()
+            instance.refresh_from_db(fields=['total_amount', 'item_count'])
         return instance
     
     def update_items(self, order, items_data):
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data['quantity']
-            
-            if product.qnt >= quantity:
-                product.qnt -= quantity
-                product.save()
-                
-                order_item, created = OrderItem.objects.get_or_create(
-                    order=order,
-                    product=product,
-                    defaults={'quantity': quantity, 'price': product.price}
-                )
-                if not created:
-                    order_item.quantity += quantity
-                    order_item.save()
-            else:
-                raise serializers.ValidationError(
-                    f"Not enough stock for {product.name}. Available: {product.qnt}, Requested: {quantity}"
-                )
+        # Lock the cart; the sweeper may have expired it since it was looked up.
+        if not Order.objects.select_for_update().filter(pk=order.pk, status='Pending').exists():
+            raise serializers.ValidationError('This order is no longer pending.')
+        products = {item_data['product'].pk: item_data['product'] for item_data in items_data}
+        quantities = group_quantities((item_data['product'].pk, item_data['quantity']) for item_data in items_data)
+        try:
+            reserve(quantities)
+        except InsufficientStock as exc:
+            raise serializers.ValidationError(exc.messages())
+
+        existing = list(OrderItem.objects.filter(order=order, product_id__in=quantities).only('id', 'product_id', 'price'))
+        added = []
+        now = timezone.now()
+        for order_item in existing:
+            quantity = quantities.pop(order_item.product_id)
+            order_item.quantity = F('quantity') + quantity
+            order_item.updated_at = now
+            added.append((order_item.price, quantity))
+        OrderItem.objects.bulk_update(existing, ['quantity', 'updated_at'])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[product_id], quantity=quantity, price=products[product_id].price)
+            for product_id, quantity in quantities.items()
+        ])
+        added.extend((products[product_id].price, quantity) for product_id, quantity in quantities.items())
+        apply_order_change(order.pk, *line_totals(added))
     
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['user'] = instance.user.id
+        if 'user' in representation:
+            representation['user'] = instance.user_id
         return representation
 
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """An order without its lines; reads only the orders table."""
+
+    class Meta:
+        model = Order
+        fields = ['id', 'order_date', 'status', 'total_amount', 'item_count']
+        read_only_fields = fields
+
+
+class OrderBulkCancelSerializer(serializers.Serializer):
+    """Filters selecting the orders to cancel; see cancellation.filter_orders()."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    user = serializers.IntegerField(required=False)
+    product = serializers.IntegerField(required=False)
+    placed_after = serializers.DateTimeField(required=False)
+    placed_before = serializers.DateTimeField(required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not set(attrs) - {'dry_run'}:
+            raise serializers.ValidationError('Give at least one filter: ids, user, product, placed_after or '
+                                              'placed_before.')
+        return attrs
+
+
+class ProductFacetsSerializer(serializers.Serializer):
+    """`?price_buckets=0,50,100`: ascending range boundaries, defaulting to PRODUCT_FACET_PRICE_BUCKETS."""
+    price_buckets = serializers.CharField(required=False)
+
+    def validate_price_buckets(self, value):
+        try:
+            boundaries = [Decimal(item.strip()) for item in value.split(',') if item.strip()]
+            if not all(boundary.is_finite() for boundary in boundaries):
+                raise InvalidOperation
+        except InvalidOperation:
+            raise serializers.ValidationError('Expected comma-separated numbers.')
+        if not boundaries or len(boundaries) > MAX_PRICE_BUCKETS:
+            raise serializers.ValidationError(f'Give between 1 and {MAX_PRICE_BUCKETS} boundaries.')
+        if any(low >= high for low, high in zip(boundaries, boundaries[1:])):
+            raise serializers.ValidationError('Boundaries must be strictly ascending.')
+        return boundaries
+
+    def validate(self, attrs):
+        attrs.setdefault('price_buckets', [Decimal(str(value)) for value in settings.PRODUCT_FACET_PRICE_BUCKETS])
+        return attrs
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .cache import invalidate
+from .models import Product, Category, Review, ProductImage
+from .order_totals import remove_product_lines
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_catalogue_cache(sender, **kwargs):
+    invalidate(sender._meta.model_name)
+
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=ProductImage)
+def touch_product(sender, instance, **kwargs):
+    # Reviews and images are part of the product payload.
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Product)
+def subtract_deleted_lines(sender, instance, **kwargs):
+    # The product's order lines are deleted by on_delete=CASCADE.
+    remove_product_lines(instance.pk)
+
+
+@receiver(pre_delete, sender=Category)
+def reroot_subcategories(sender, instance, **kwargs):
+    # Children are detached by on_delete=SET_NULL, so their subtrees become roots.
+    if instance.path:
+        Category.move_subtree(instance.path, '/')
+    Category.objects.filter(parent_cat=instance).update(updated_at=timezone.now())
+    Category.touch({instance.parent_cat_id} - {None})
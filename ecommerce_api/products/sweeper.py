@@ -0,0 +1,43 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .cancellation import CANCEL_BATCH_SIZE, close_batch
+from .models import Order
+
+logger = logging.getLogger('products.sweeper')
+
+
+def idle_carts(ttl=None, now=None):
+    """Pending orders untouched for `ttl` (default CART_EXPIRY_MINUTES), oldest first."""
+    ttl = ttl if ttl is not None else timedelta(minutes=settings.CART_EXPIRY_MINUTES)
+    return Order.objects.filter(
+        status='Pending', last_activity__lt=(now or timezone.now()) - ttl
+    ).order_by('last_activity', 'pk')
+
+
+def expire_idle_carts(ttl=None, batch_size=CANCEL_BATCH_SIZE, now=None):
+    """
+    Mark idle carts Expired and release their stock, `batch_size` orders per
+    transaction (see cancellation.close_batch). Batches are read from the
+    head of order_pending_activity_idx; every order taken either expires or,
+    if it got new lines meanwhile, is no longer idle, so the next batch needs
+    no offset. Returns the counts plus elapsed seconds and orders per second,
+    and logs them to `products.sweeper`.
+    """
+    carts = idle_carts(ttl, now or timezone.now())
+    report = {'expired': 0, 'restocked_units': 0, 'batches': 0}
+    start = time.perf_counter()
+    while ids := list(carts.values_list('pk', flat=True)[:batch_size]):
+        expired, units = close_batch(carts, ids, 'Expired')
+        if expired:
+            report['expired'] += expired
+            report['restocked_units'] += units
+            report['batches'] += 1
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    report['orders_per_second'] = round(report['expired'] / report['seconds'], 1) if report['seconds'] else None
+    if report['expired']:
+        logger.info('Expired %(expired)d idle carts in %(batches)d batches, released %(restocked_units)d units '
+                    'in %(seconds).3fs (%(orders_per_second)s orders/s)', report)
+    return report
@@ -1,3 +1,1471 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.test import AsyncClient, RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from ecommerce_api.db_routing import ReplicaRouter, ReplicaRoutingMiddleware, get_cache as get_pin_cache
+from ecommerce_api.metrics import registry as metrics_registry
+from ecommerce_api.pagination import KeysetPagination
+from ecommerce_api.sqlite import WriteQueue, configure_connection, write_queue
+from .models import Category, Product, Review, ProductImage, Order, OrderItem, Wishlist, WishlistItem
+from .inventory import InsufficientStock, reserve
+from .cache import get_cache, stats as cache_stats
+from .cancellation import cancel_orders, filter_orders
+from .filters import ProductFilter
+from .sweeper import expire_idle_carts, idle_carts
+from .order_totals import apply_order_change, line_totals
+from .ratings import apply_rating_change
+from .views import CategoryViewSet, OrderItemViewSet, OrderViewSet, ProductViewSet, ReviewViewSet
 
-# Create your tests here.
+User = get_user_model()
+
+
+def make_products(category, count, user=None):
+    products = []
+    for i in range(count):
+        product = Product.objects.create(
+            name=f'Product {i}', description='desc', price='10.00', qnt=10, category=category
+        )
+        ProductImage.objects.create(product=product, image_url=f'http://example.com/{i}.png')
+        if user:
+            Review.objects.create(user=user, product=product, rating=4)
+        products.append(product)
+    return products
+
+
+class ProductQueryCountTests(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Books')
+        self.user = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass12345')
+
+    def test_list_query_count_is_constant(self):
+        url = reverse('product-list')
+        make_products(self.category, 2, self.user)
+        # ETag aggregate, products, reviews and images.
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345')
+        for product in make_products(self.category, 10, other):
+            Review.objects.create(user=self.user, product=product, rating=5)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_retrieve_query_count(self):
+        product = make_products(self.category, 1, self.user)[0]
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('product-detail', args=[product.pk]))
+        self.assertEqual(response.data['category'], 'Books')
+        self.assertEqual(response.data['reviews'][0]['user'], 'reviewer')
+
+
+class ProductPaginationTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Books')
+        self.products = make_products(category, 7)
+        for product, price in zip(self.products, ['5.00', '5.00', '5.00', '7.50', '7.50', '9.00', '1.00']):
+            product.price = price
+            product.save()
+
+    def walk(self, url):
+        ids, previous = [], None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            previous, url = url, response.data['next']
+        return ids, previous
+
+    def test_default_ordering_is_newest_first(self):
+        ids, _ = self.walk(reverse('product-list') + '?page_size=3')
+        self.assertEqual(ids, [p.pk for p in reversed(self.products)])
+
+    def test_ordering_with_ties_visits_every_row_once(self):
+        ids, last_page = self.walk(reverse('product-list') + '?ordering=price&page_size=2')
+        expected = sorted(self.products, key=lambda p: (float(p.price), p.pk))
+        self.assertEqual(ids, [p.pk for p in expected])
+
+        response = self.client.get(last_page)
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], [p.pk for p in expected[4:6]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('product-list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductRatingStatsTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Books')
+        self.product, self.other = make_products(category, 2)
+        self.user = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass12345')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('product-reviews-list', args=[self.product.pk])
+
+    def test_review_writes_maintain_stats(self):
+        first = self.client.post(self.url, {'rating': 5}).data['id']
+        second = self.client.post(self.url, {'rating': 2}).data['id']
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(str(self.product.rating_avg), '3.50')
+        self.assertEqual(self.product.rating_histogram, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+
+        self.client.patch(reverse('product-reviews-detail', args=[self.product.pk, second]), {'rating': 4})
+        self.client.delete(reverse('product-reviews-detail', args=[self.product.pk, first]))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 1)
+        self.assertEqual(str(self.product.rating_avg), '4.00')
+        self.assertEqual(self.product.rating_histogram, {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0})
+
+    def test_concurrent_review_writes_keep_stats(self):
+        review_id = self.client.post(self.url, {'rating': 5}).data['id']
+        url = reverse('product-reviews-detail', args=[self.product.pk, review_id])
+        get_object = ReviewViewSet.get_object
+
+        def get_object_then(change):
+            def stale_get_object(view):
+                instance = get_object(view)
+                # A concurrent request commits between this read and the lock.
+                change(instance)
+                return instance
+            return stale_get_object
+
+        def rate(rating):
+            def edit(review):
+                old = Review.objects.get(pk=review.pk).rating
+                Review.objects.filter(pk=review.pk).update(rating=rating)
+                apply_rating_change(review.product_id, added=rating, removed=old)
+            return edit
+
+        with patch.object(ReviewViewSet, 'get_object', get_object_then(rate(3))):
+            self.assertEqual(self.client.patch(url, {'comment': 'Still good'}).status_code, 200)
+        self.assertEqual(Review.objects.get().rating, 3)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, {'1': 0, '2': 0, '3': 1, '4': 0, '5': 0})
+
+        with patch.object(ReviewViewSet, 'get_object', get_object_then(rate(2))):
+            self.assertEqual(self.client.patch(url, {'rating': 4}).status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0})
+
+        def delete(review):
+            Review.objects.filter(pk=review.pk).delete()
+            apply_rating_change(review.product_id, removed=4)
+
+        with patch.object(ReviewViewSet, 'get_object', get_object_then(delete)):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_histogram['4']), (0, 0))
+
+    def test_filter_and_order_by_rating(self):
+        self.client.post(self.url, {'rating': 5})
+        Review.objects.create(user=self.user, product=self.other, rating=3)
+        call_command('rebuild_rating_stats', stdout=StringIO())
+
+        response = self.client.get(reverse('product-list') + '?rating_min=4')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.product.pk])
+        response = self.client.get(reverse('product-list') + '?ordering=rating_avg')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.other.pk, self.product.pk])
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Books')
+
+    def create(self, name, description):
+        return Product.objects.create(name=name, description=description, price='5.00', qnt=1, category=self.category)
+
+    def search(self, terms, **params):
+        response = self.client.get(reverse('product-list'), {'search': terms, **params})
+        return [item['id'] for item in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        in_description = self.create('Mug', 'A mug for keyboard enthusiasts')
+        in_name = self.create('Mechanical keyboard', 'Clicky switches')
+        self.create('Lamp', 'Bright')
+        self.assertEqual(self.search('keyboard'), [in_name.pk, in_description.pk])
+        self.assertEqual(self.search('key'), [in_name.pk, in_description.pk])
+        self.assertEqual(self.search('mechanical keyboard'), [in_name.pk])
+
+    def test_index_follows_writes(self):
+        product = self.create('Desk', 'Oak')
+        product.name = 'Standing table'
+        product.save()
+        self.assertEqual(self.search('desk'), [])
+        self.assertEqual(self.search('table'), [product.pk])
+        Product.objects.filter(pk=product.pk).update(description='Walnut')
+        self.assertEqual(self.search('walnut'), [product.pk])
+        product.delete()
+        self.assertEqual(self.search('table'), [])
+
+    def test_paginates_ranked_results(self):
+        products = [self.create(f'Chair {i}', 'chair ' * i) for i in range(1, 6)]
+        ids, url = [], reverse('product-list') + '?search=chair&page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(ids), sorted(p.pk for p in products))
+        self.assertEqual(len(ids), len(products))
+        self.assertEqual(self.search('chair', ordering='price', page_size=10)[0], products[0].pk)
+
+    def test_rebuild_command(self):
+        product = self.create('Kettle', 'Steel')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('kettle'), [product.pk])
+
+
+class OrderItemsTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Books')
+        self.products = make_products(category, 6)
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('order-list')
+
+    def order(self, lines):
+        items = [{'product_id': product.pk, 'quantity': quantity} for product, quantity in lines]
+        return self.client.post(self.url, {'items': items}, format='json')
+
+    def stock(self):
+        return [product.qnt for product in Product.objects.order_by('pk')]
+
+    def test_lines_are_merged_into_pending_order(self):
+        first, second = self.products[:2]
+        self.assertEqual(self.order([(first, 2), (second, 1), (first, 1)]).status_code, 200)
+        response = self.order([(second, 4)])
+        self.assertEqual(response.status_code, 200)
+
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity', 'price')),
+            [(first.pk, 3, Decimal('10.00')), (second.pk, 5, Decimal('10.00'))],
+        )
+        self.assertEqual(self.stock()[:3], [7, 5, 10])
+
+    def test_insufficient_stock_rolls_back(self):
+        first, second = self.products[:2]
+        response = self.order([(first, 2), (second, 11)])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.stock()[:2], [10, 10])
+
+    def test_write_statements_do_not_grow_with_lines(self):
+        def writes(lines):
+            with CaptureQueriesContext(connection) as ctx:
+                self.order(lines)
+            Order.objects.all().delete()
+            return [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith('SELECT')]
+
+        small = writes([(self.products[0], 1)])
+        large = writes([(product, 1) for product in self.products])
+        self.assertEqual(len(small), len(large))
+
+
+class OrderTotalsTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Books')
+        self.products = make_products(category, 3)
+        Product.objects.filter(pk=self.products[1].pk).update(price='2.50')
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.client.force_authenticate(self.user)
+
+    def order(self, lines):
+        items = [{'product_id': product.pk, 'quantity': quantity} for product, quantity in lines]
+        return self.client.post(reverse('order-list'), {'items': items}, format='json')
+
+    def totals(self):
+        return list(Order.objects.values_list('total_amount', 'item_count'))
+
+    def test_totals_follow_line_changes(self):
+        first, second, _ = self.products
+        response = self.order([(first, 2)])
+        self.assertEqual((response.data['total_amount'], response.data['item_count']), ('20.00', 2))
+        response = self.order([(first, 1), (second, 4)])
+        self.assertEqual((response.data['total_amount'], response.data['item_count']), ('40.00', 7))
+        self.assertEqual(self.totals(), [(Decimal('40.00'), 7)])
+
+        item = OrderItem.objects.get(product=second)
+        self.client.patch(reverse('order-item-detail', args=[item.pk]), {'quantity': 2}, format='json')
+        self.assertEqual(self.totals(), [(Decimal('35.00'), 5)])
+        self.client.delete(reverse('order-item-detail', args=[item.pk]))
+        self.assertEqual(self.totals(), [(Decimal('30.00'), 3)])
+
+        order = Order.objects.get()
+        self.assertEqual(self.client.post(reverse('order-cancel', args=[order.pk])).status_code, 200)
+        self.assertEqual(list(Order.objects.values_list('status', 'total_amount', 'item_count')),
+                         [('Cancelled', Decimal('30.00'), 3)])
+
+    def test_line_edits_read_quantity_under_lock(self):
+        self.order([(self.products[1], 4)])
+        get_object = OrderItemViewSet.get_object
+
+        def stale_get_object(view):
+            instance = get_object(view)
+            # A concurrent PATCH to 6 commits between this read and the lock.
+            OrderItem.objects.filter(pk=instance.pk).update(quantity=6)
+            apply_order_change(instance.order_id, *line_totals([(instance.price, 2)]))
+            return instance
+
+        url = reverse('order-item-detail', args=[OrderItem.objects.get().pk])
+        with patch.object(OrderItemViewSet, 'get_object', stale_get_object):
+            self.assertEqual(self.client.patch(url, {'quantity': 1}, format='json').status_code, 200)
+        self.assertEqual(self.totals(), [(Decimal('2.50'), 1)])
+
+    def test_closed_orders_keep_their_totals(self):
+        order_id = self.order([(self.products[0], 2)]).data['id']
+        Order.objects.update(status='Expired')
+        url = reverse('order-item-detail', args=[OrderItem.objects.get().pk])
+        self.assertEqual(self.client.patch(url, {'quantity': 5}, format='json').status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.totals(), [(Decimal('20.00'), 2)])
+        self.assertEqual(Order.objects.get(pk=order_id).status, 'Expired')
+
+    def test_deleted_products_leave_their_orders(self):
+        first, second, _ = self.products
+        self.order([(first, 1), (second, 2)])
+        Order.objects.update(status='Completed')
+        self.order([(second, 1)])
+        Product.objects.get(pk=second.pk).delete()
+        self.assertEqual(sorted(self.totals()), [(Decimal('0.00'), 0), (Decimal('10.00'), 1)])
+        first.category.delete()
+        self.assertEqual(self.totals(), [(Decimal('0.00'), 0), (Decimal('0.00'), 0)])
+
+    def test_rebuild_matches_maintained_totals(self):
+        self.order([(self.products[0], 1), (self.products[1], 3)])
+        expected = self.totals()
+        Order.objects.update(total_amount=0, item_count=0)
+        call_command('rebuild_order_totals', stdout=StringIO())
+        self.assertEqual(self.totals(), expected)
+
+    def test_summary_reads_only_orders(self):
+        for _ in range(3):
+            self.order([(self.products[0], 1)])
+            Order.objects.update(status='Completed')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('order-list'), {'view': 'summary'})
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn('products_orderitem', ctx.captured_queries[0]['sql'])
+        self.assertEqual(response.data['results'][0], {
+            'id': response.data['results'][0]['id'], 'order_date': response.data['results'][0]['order_date'],
+            'status': 'Completed', 'total_amount': '10.00', 'item_count': 1,
+        })
+        self.assertEqual(len(response.data['results']), 3)
+
+
+class OrderCancellationTests(APITestCase):
+    def setUp(self):
+        self.products = make_products(Category.objects.create(name='Books'), 3)
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.admin = User.objects.create_user('boss', 'boss@example.com', 'pass12345', is_admin=True)
+
+    def place(self, user, lines, status='Pending'):
+        order = Order.objects.create(user=user, status=status)
+        for product, quantity in lines:
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        return order
+
+    def stock(self):
+        return list(Product.objects.order_by('pk').values_list('qnt', flat=True))
+
+    def test_cancel_restocks_once(self):
+        order = self.place(self.user, [(self.products[0], 2), (self.products[1], 1)])
+        self.client.force_authenticate(self.user)
+        url = reverse('order-cancel', args=[order.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'UPDATE "products_product"' in q['sql']]), 1)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.stock(), [12, 11, 10])
+
+    def test_bulk_cancel(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345')
+        orders = [self.place(self.user, [(self.products[0], 1), (self.products[1], 2)]) for _ in range(5)]
+        self.place(self.user, [(self.products[0], 1)], status='Completed')
+        self.place(other, [(self.products[0], 1)])
+        url = reverse('order-bulk-cancel')
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(url, {'user': self.user.pk}, format='json').status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.post(url, {'dry_run': True}, format='json').status_code, 400)
+        response = self.client.post(url, {'user': self.user.pk, 'dry_run': True}, format='json')
+        self.assertEqual(response.data, {'matched': 5})
+
+        with CaptureQueriesContext(connection) as ctx:
+            report = cancel_orders(filter_orders(Order.objects.all(), user=self.user.pk), batch_size=2)
+        self.assertEqual(report, {'cancelled': 5, 'restocked_units': 15, 'batches': 3})
+        self.assertLessEqual(len(ctx), 3 * 7 + 1)
+        self.assertEqual(self.stock(), [15, 20, 10])
+        self.assertEqual(Order.objects.filter(pk__in=[o.pk for o in orders], status='Cancelled').count(), 5)
+
+        response = self.client.post(url, {'product': self.products[0].pk}, format='json')
+        self.assertEqual(response.data, {'cancelled': 1, 'restocked_units': 1, 'batches': 1})
+        self.assertEqual(Order.objects.filter(status='Pending').count(), 0)
+
+    def test_command(self):
+        self.place(self.user, [(self.products[2], 4)])
+        out = StringIO()
+        call_command('cancel_orders', '--user', str(self.user.pk), stdout=out)
+        self.assertIn('Cancelled 1 orders', out.getvalue())
+        self.assertEqual(self.stock()[2], 14)
+
+
+@override_settings(CART_EXPIRY_MINUTES=30)
+class CartSweeperTests(APITestCase):
+    def setUp(self):
+        self.products = make_products(Category.objects.create(name='Books'), 2)
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+
+    def cart(self, idle_minutes, status='Pending', quantity=1):
+        order = Order.objects.create(user=self.user, status=status)
+        OrderItem.objects.create(order=order, product=self.products[0], quantity=quantity, price='10.00')
+        Order.objects.filter(pk=order.pk).update(last_activity=timezone.now() - timedelta(minutes=idle_minutes))
+        return order
+
+    def test_expires_idle_carts_only(self):
+        idle = [self.cart(45, quantity=2) for _ in range(3)]
+        fresh = self.cart(5)
+        done = self.cart(45, status='Completed')
+        with CaptureQueriesContext(connection) as ctx:
+            report = expire_idle_carts(batch_size=2)
+        self.assertEqual((report['expired'], report['restocked_units'], report['batches']), (3, 6, 2))
+        self.assertLessEqual(len(ctx), 2 * 7 + 1)
+        self.assertEqual(set(Order.objects.filter(status='Expired').values_list('pk', flat=True)),
+                         {order.pk for order in idle})
+        self.assertEqual(Order.objects.get(pk=fresh.pk).status, 'Pending')
+        self.assertEqual(Order.objects.get(pk=done.pk).status, 'Completed')
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).qnt, 16)
+        self.assertEqual(expire_idle_carts()['expired'], 0)
+
+    def test_activity_keeps_cart_alive(self):
+        order = self.cart(45)
+        self.client.force_authenticate(self.user)
+        url = reverse('order-detail', args=[order.pk])
+        items = [{'product_id': self.products[1].pk, 'quantity': 1}]
+        self.assertEqual(self.client.patch(url, {'items': items}, format='json').status_code, 200)
+        self.assertFalse(idle_carts().filter(pk=order.pk).exists())
+
+        Order.objects.filter(pk=order.pk).update(status='Expired')
+        response = self.client.patch(url, {'items': items}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_expired_cart_lines_are_frozen(self):
+        order = self.cart(45, quantity=3)
+        expire_idle_carts()
+        order.refresh_from_db()
+        self.client.force_authenticate(self.user)
+        url = reverse('order-item-detail', args=[order.items.get().pk])
+        self.assertEqual(self.client.patch(url, {'quantity': 1}, format='json').status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).qnt, 13)
+        self.assertEqual(Order.objects.get(pk=order.pk).last_activity, order.last_activity)
+
+    def test_command(self):
+        self.cart(10)
+        out = StringIO()
+        call_command('expire_carts', '--ttl-minutes', '5', stdout=out)
+        self.assertIn('Expired 1 carts', out.getvalue())
+        self.assertEqual(Order.objects.get().status, 'Expired')
+
+
+class InventoryTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Books')
+        self.first, self.second, self.third = make_products(category, 3)
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.client.force_authenticate(self.user)
+
+    def test_reserve_reports_every_short_line(self):
+        with self.assertRaises(InsufficientStock) as ctx:
+            reserve({self.first.pk: 11, self.second.pk: 5, self.third.pk: 12})
+        self.assertEqual(
+            [(f['product_id'], f['requested'], f['available']) for f in ctx.exception.failures],
+            [(self.first.pk, 11, 10), (self.third.pk, 12, 10)],
+        )
+        self.assertEqual(list(Product.objects.order_by('pk').values_list('qnt', flat=True)), [10, 10, 10])
+
+    def test_cancel_and_item_delete_release_stock(self):
+        items = [{'product_id': self.first.pk, 'quantity': 4}, {'product_id': self.second.pk, 'quantity': 3}]
+        order_id = self.client.post(reverse('order-list'), {'items': items}, format='json').data['id']
+        item = OrderItem.objects.get(product=self.second)
+
+        self.client.delete(reverse('order-item-detail', args=[item.pk]))
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.qnt, 10)
+
+        response = self.client.post(reverse('order-cancel', args=[order_id]))
+        self.assertEqual(response.status_code, 200)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.qnt, 10)
+
+    def test_item_quantity_changes_move_stock(self):
+        self.client.post(reverse('order-list'), {'items': [{'product_id': self.first.pk, 'quantity': 4}]}, format='json')
+        url = reverse('order-item-detail', args=[OrderItem.objects.get().pk])
+        self.assertEqual(self.client.patch(url, {'quantity': 9}, format='json').status_code, 200)
+        self.assertEqual(self.client.patch(url, {'quantity': 11}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(url, {'quantity': 2}, format='json').status_code, 200)
+        response = self.client.patch(url, {'product_id': self.second.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.qnt, OrderItem.objects.get().quantity), (8, 2))
+
+    def test_closed_order_lines_are_frozen(self):
+        order_id = self.client.post(reverse('order-list'), {'items': [{'product_id': self.first.pk, 'quantity': 4}]},
+                                    format='json').data['id']
+        self.assertEqual(self.client.post(reverse('order-cancel', args=[order_id])).status_code, 200)
+        url = reverse('order-item-detail', args=[OrderItem.objects.get().pk])
+        self.assertEqual(self.client.patch(url, {'quantity': 9}, format='json').status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.qnt, OrderItem.objects.get().quantity), (10, 4))
+
+    def test_order_delete_releases_under_lock(self):
+        order_id = self.client.post(reverse('order-list'), {'items': [{'product_id': self.first.pk, 'quantity': 4}]},
+                                    format='json').data['id']
+        url = reverse('order-detail', args=[order_id])
+        get_object = OrderViewSet.get_object
+
+        def get_object_then(change):
+            def stale_get_object(view):
+                instance = get_object(view)
+                # A concurrent request races this read and the lock.
+                change(instance)
+                return instance
+            return stale_get_object
+
+        def add_line(order):
+            reserve({self.second.pk: 3})
+            OrderItem.objects.create(order=order, product=self.second, quantity=3, price=self.second.price)
+
+        with patch.object(OrderViewSet, 'get_object', get_object_then(add_line)):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(list(Product.objects.order_by('pk').values_list('qnt', flat=True)), [10, 10, 10])
+
+        order_id = self.client.post(reverse('order-list'), {'items': [{'product_id': self.first.pk, 'quantity': 4}]},
+                                    format='json').data['id']
+        url = reverse('order-detail', args=[order_id])
+        cancel_orders(Order.objects.filter(pk=order_id))
+        # The order as read just before the cancel committed.
+        still_pending = lambda order: setattr(order, 'status', 'Pending')
+        with patch.object(OrderViewSet, 'get_object', get_object_then(still_pending)):
+            self.assertEqual(self.client.delete(url).status_code, 400)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.qnt, Order.objects.get().status), (10, 'Cancelled'))
+
+
+class InventoryConcurrencyTests(TransactionTestCase):
+    def test_concurrent_reservations_never_oversell(self):
+        category = Category.objects.create(name='Books')
+        product = Product.objects.create(name='Hot item', description='', price='1.00', qnt=25, category=category)
+        successes, failures = [], []
+        barrier = threading.Barrier(16)
+
+        def attempt():
+            # SQLite's shared in-memory test database reports lock contention
+            # at once instead of waiting for busy_timeout; retry as a client
+            # would, so every attempt ends in a sale or a stock-out.
+            for _ in range(1000):
+                try:
+                    reserve({product.pk: 1})
+                    return True
+                except InsufficientStock:
+                    return False
+                except OperationalError:
+                    time.sleep(0.001)
+            raise AssertionError('Lock contention never cleared.')
+
+        def buyer():
+            barrier.wait()
+            try:
+                for _ in range(5):
+                    (successes if attempt() else failures).append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buyer) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual((len(successes), len(failures)), (25, 80 - 25))
+        self.assertEqual(product.qnt, 0)
+
+
+class CatalogueCacheTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.category = Category.objects.create(name='Books')
+        self.product = make_products(self.category, 1)[0]
+        self.url = reverse('product-list')
+
+    def test_repeated_reads_are_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url, {'is_active': 'true', 'ordering': 'price'})['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'ordering': 'price', 'is_active': 'true'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['id'], self.product.pk)
+        self.assertEqual(self.client.get(self.url, {'ordering': '-price'})['X-Cache'], 'MISS')
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 2, 'hit_ratio': 0.3333})
+
+    def test_writes_invalidate(self):
+        detail = reverse('product-detail', args=[self.product.pk])
+        self.client.get(detail)
+        self.category.name = 'Novels'
+        self.category.save()
+        response = self.client.get(detail)
+        self.assertEqual((response['X-Cache'], response.data['category']), ('MISS', 'Novels'))
+
+        reserve({self.product.pk: 3})
+        response = self.client.get(detail)
+        self.assertEqual((response['X-Cache'], response.data['qnt']), ('MISS', 7))
+
+        ProductImage.objects.create(product=self.product, image_url='http://example.com/new.png')
+        self.assertEqual(len(self.client.get(detail).data['image_url']), 2)
+
+    def test_category_reads_are_cached(self):
+        url = reverse('category-list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        Category.objects.create(name='Sub', parent_cat=self.category)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class CategoryTreeTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.root = Category.objects.create(name='Root')
+        self.child = Category.objects.create(name='Child', parent_cat=self.root)
+        self.leaf = Category.objects.create(name='Leaf', parent_cat=self.child)
+        self.other = Category.objects.create(name='Other')
+
+    def paths(self):
+        return dict(Category.objects.values_list('name', 'path'))
+
+    def test_paths_follow_moves_and_deletes(self):
+        r, c, l, o = self.root.pk, self.child.pk, self.leaf.pk, self.other.pk
+        self.assertEqual(self.paths()['Leaf'], f'/{r}/{c}/{l}/')
+
+        self.child.parent_cat = self.other
+        self.child.save()
+        self.assertEqual(self.paths(), {'Root': f'/{r}/', 'Other': f'/{o}/', 'Child': f'/{o}/{c}/', 'Leaf': f'/{o}/{c}/{l}/'})
+
+        self.other.delete()
+        self.assertEqual(self.paths(), {'Root': f'/{r}/', 'Child': f'/{c}/', 'Leaf': f'/{c}/{l}/'})
+
+    def test_path_compares_bytewise(self):
+        field = Category._meta.get_field('path')
+        for vendor, collation in [('postgresql', 'C'), ('mysql', 'utf8mb4_bin')]:
+            with patch.object(connection, 'vendor', vendor):
+                self.assertEqual(field.db_parameters(connection)['collation'], collation)
+        # The subtree of '/1/' ends before '/10', so '/10/' is not in it.
+        ten = Category.objects.create(name='Ten')
+        Category.objects.filter(pk=ten.pk).update(path=f'/{self.root.pk}0/')
+        self.assertNotIn(ten.pk, self.root.descendants().values_list('pk', flat=True))
+
+    def test_cannot_move_under_descendant(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_authenticate(user)
+        response = self.client.patch(reverse('category-detail', args=[self.root.pk]), {'parent_cat': self.leaf.pk})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tree_in_one_query(self):
+        # Plus the ETag aggregate.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('category-tree'))
+        self.assertEqual([node['name'] for node in response.data], ['Root', 'Other'])
+        self.assertEqual(response.data[0]['children'][0]['children'][0]['id'], self.leaf.pk)
+
+    def test_products_filtered_by_subtree(self):
+        in_root, in_leaf = make_products(self.root, 1) + make_products(self.leaf, 1)
+        make_products(self.other, 1)
+        response = self.client.get(reverse('product-list'), {'category_tree': self.root.pk})
+        self.assertEqual(sorted(item['id'] for item in response.data['results']), [in_root.pk, in_leaf.pk])
+        response = self.client.get(reverse('product-list'), {'category_tree': self.child.pk})
+        self.assertEqual([item['id'] for item in response.data['results']], [in_leaf.pk])
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        category = Category.objects.create(name='Books')
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.products = make_products(category, 3, self.user)
+        self.client.force_authenticate(self.user)
+        items = [{'product_id': product.pk, 'quantity': 1} for product in self.products]
+        self.client.post(reverse('order-list'), {'items': items}, format='json')
+
+    def test_product_fields_and_expand(self):
+        url = reverse('product-list')
+        # Each count includes the ETag aggregate.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'fields': 'id,name,price'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price'})
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'expand': 'images'})
+        product = response.data['results'][0]
+        self.assertIn('image_url', product)
+        self.assertNotIn('reviews', product)
+        self.assertIn('reviews', self.client.get(url).data['results'][0])
+
+    def test_nested_products_are_compact_unless_expanded(self):
+        url = reverse('order-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        product = response.data['results'][0]['items'][0]['product']
+        self.assertNotIn('reviews', product)
+        self.assertNotIn('image_url', product)
+        self.assertEqual(product['category'], 'Books')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'expand': 'reviews', 'fields': 'id,items.quantity,items.product.name'})
+        order = response.data['results'][0]
+        self.assertEqual(set(order), {'id', 'items'})
+        self.assertEqual(set(order['items'][0]), {'quantity', 'product'})
+        self.assertEqual(set(order['items'][0]['product']), {'name', 'reviews'})
+
+    def test_wishlist_honours_fields(self):
+        self.client.post(reverse('wishlist'), {'product_id': self.products[0].pk})
+        response = self.client.get(reverse('wishlist'), {'fields': 'items.product.id'})
+        self.assertEqual(response.data['items'][0]['product'], {'id': self.products[0].pk})
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Books')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.products = make_products(category, 3, self.admin)
+        self.client.force_authenticate(self.admin)
+
+    def stream(self, dataset, **params):
+        response = self.client.get(reverse('export', args=[dataset]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_products_ndjson_and_csv(self):
+        rows = [json.loads(line) for line in self.stream('products').splitlines()]
+        self.assertEqual([row['id'] for row in rows], [p.pk for p in self.products])
+        self.assertEqual(rows[0]['category__name'], 'Books')
+        self.assertEqual(rows[0]['price'], '10.00')
+
+        lines = self.stream('products', output='csv').splitlines()
+        self.assertTrue(lines[0].startswith('id,sku,name,description,price'))
+        self.assertEqual(len(lines), 4)
+
+    def test_since_selects_newer_rows(self):
+        cutoff = Product.objects.get(pk=self.products[1].pk).updated_at
+        rows = self.stream('reviews', since=Review.objects.order_by('pk')[1].updated_at.isoformat())
+        self.assertEqual(len(rows.splitlines()), 1)
+        rows = self.stream('products', since=cutoff.isoformat())
+        self.assertEqual([json.loads(line)['id'] for line in rows.splitlines()], [self.products[2].pk])
+        response = self.client.get(reverse('export', args=['products']), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_since_includes_changes_to_older_orders(self):
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.client.force_authenticate(buyer)
+        order_id = self.client.post(reverse('order-list'), {'items': [{'product_id': self.products[0].pk, 'quantity': 1}]},
+                                    format='json').data['id']
+        placed = timezone.now() - timedelta(days=1)
+        Order.objects.update(updated_at=placed)
+        OrderItem.objects.update(updated_at=placed)
+        since = (placed + timedelta(hours=1)).isoformat()
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.stream('orders', since=since), '')
+
+        # A line added to the old cart exports both the line and the order.
+        self.client.force_authenticate(buyer)
+        self.client.post(reverse('order-list'), {'items': [{'product_id': self.products[1].pk, 'quantity': 2}]},
+                         format='json')
+        self.client.force_authenticate(self.admin)
+        orders = [json.loads(line) for line in self.stream('orders', since=since).splitlines()]
+        self.assertEqual([(row['id'], row['item_count']) for row in orders], [(order_id, 3)])
+        items = [json.loads(line) for line in self.stream('order-items', since=since).splitlines()]
+        self.assertEqual([row['product_id'] for row in items], [self.products[1].pk])
+
+        # So does a status change.
+        Order.objects.update(updated_at=placed)
+        cancel_orders(Order.objects.filter(pk=order_id))
+        orders = [json.loads(line) for line in self.stream('orders', since=since).splitlines()]
+        self.assertEqual([(row['id'], row['status']) for row in orders], [(order_id, 'Cancelled')])
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user('buyer', 'buyer@example.com', 'pass12345'))
+        self.assertEqual(self.client.get(reverse('export', args=['orders'])).status_code, 403)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_data', 'order-items', '--output', 'csv', stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[0].split(',')[:2], ['id', 'order_id'])
+
+
+class ProductImportTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        Category.objects.create(name='Books')
+        Category.objects.create(name='Games')
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pass12345'))
+
+    def upload(self, name, content, **params):
+        upload = SimpleUploadedFile(name, content.encode())
+        url = reverse('product-import') + ('?' + '&'.join(f'{k}={v}' for k, v in params.items()) if params else '')
+        return self.client.post(url, {'file': upload}, format='multipart')
+
+    def test_csv_upsert_with_images_and_errors(self):
+        feed = (
+            'sku,name,description,price,qnt,category,is_active,images\n'
+            'B-1,Dune,Sci-fi,9.99,5,Books,true,http://example.com/a.png|http://example.com/b.png\n'
+            'B-2,Chess,Board,abc,1,Games,true,\n'
+            'B-3,Poker,Cards,4.50,2,Sports,true,\n'
+            'B-4,Go,Stones,19.00,3,Games,no,\n'
+        )
+        response = self.upload('feed.csv', feed, batch_size=2)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (2, 0, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertFalse(Product.objects.get(sku='B-4').is_active)
+        self.assertEqual(ProductImage.objects.filter(product__sku='B-1').count(), 2)
+
+        update = (
+            '{"sku": "B-1", "name": "Dune (2nd ed.)", "description": "Sci-fi", "price": "12.00", "qnt": 7, '
+            '"category": "Books", "images": [{"image_url": "http://example.com/a.png", "alt_text": "Cover"}]}\n'
+            'not json\n'
+        )
+        response = self.upload('feed.ndjson', update)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (0, 1, 1))
+        product = Product.objects.get(sku='B-1')
+        self.assertEqual((product.name, product.qnt), ('Dune (2nd ed.)', 7))
+        self.assertEqual(ProductImage.objects.get(product=product, image_url='http://example.com/a.png').alt_text, 'Cover')
+        self.assertEqual(ProductImage.objects.filter(product=product).count(), 2)
+
+    def test_imported_products_are_searchable(self):
+        self.upload('feed.ndjson', '{"sku": "G-1", "name": "Catan", "description": "Trading", "price": 30, '
+                                   '"qnt": 1, "category": "Games"}\n')
+        response = self.client.get(reverse('product-list'), {'search': 'catan'})
+        self.assertEqual([item['sku'] for item in response.data['results']], ['G-1'])
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+            fh.write('sku,name,description,price,qnt,category\nX-1,Risk,War,20.00,2,Games\n')
+        self.addCleanup(os.remove, fh.name)
+        out = StringIO()
+        call_command('import_products', fh.name, stdout=out, stderr=StringIO())
+        self.assertIn('Created 1, updated 0, failed 0.', out.getvalue())
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as fh:
+            fh.write('sku,name,description,price,qnt,category\nX-2,Go,Stones,15.00,1,Games\n')
+        self.addCleanup(os.remove, fh.name)
+        with self.assertRaisesMessage(CommandError, '--input csv or ndjson'):
+            call_command('import_products', fh.name, stdout=StringIO(), stderr=StringIO())
+        call_command('import_products', fh.name, '--input', 'csv', stdout=out, stderr=StringIO())
+        self.assertEqual(Product.objects.filter(sku__in=['X-1', 'X-2']).count(), 2)
+
+
+class ProductFacetsTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.books = Category.objects.create(name='Books')
+        self.games = Category.objects.create(name='Games')
+        for name, category, price, qnt, active in [
+            ('Red book', self.books, '5.00', 3, True), ('Blue book', self.books, '30.00', 0, True),
+            ('Old book', self.books, '30.00', 1, False), ('Red game', self.games, '120.00', 2, True),
+        ]:
+            Product.objects.create(name=name, description='desc', price=price, qnt=qnt, category=category,
+                                   is_active=active)
+
+    def test_counts(self):
+        # The ETag aggregate, the conditional counts and the category GROUP BY.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('product-facets'), {'price_buckets': '0,25,100'})
+        self.assertEqual(response.data, {
+            'count': 4,
+            'categories': [{'id': self.books.pk, 'name': 'Books', 'count': 3},
+                           {'id': self.games.pk, 'name': 'Games', 'count': 1}],
+            'price': [{'min': '0', 'max': '25', 'count': 1}, {'min': '25', 'max': '100', 'count': 2},
+                      {'min': '100', 'max': None, 'count': 1}],
+            'is_active': {'true': 3, 'false': 1},
+            'in_stock': {'true': 3, 'false': 1},
+        })
+
+    def test_uses_list_filters_and_search(self):
+        response = self.client.get(reverse('product-facets'), {'search': 'red', 'is_active': 'true'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([row['count'] for row in response.data['price']], [1, 0, 0, 1, 0, 0, 0])
+        response = self.client.get(reverse('product-facets'), {'category_tree': self.games.pk, 'price_max': '50'})
+        self.assertEqual((response.data['count'], response.data['categories']), (0, []))
+
+    def test_cached_per_filter_signature(self):
+        url = reverse('product-facets')
+        self.assertEqual(self.client.get(url, {'is_active': 'true'})['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'is_active': 'true', 'ordering': '-price', 'page_size': 5})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        Product.objects.create(name='New', description='desc', price='1.00', qnt=1, category=self.games)
+        response = self.client.get(url, {'is_active': 'true'})
+        self.assertEqual((response['X-Cache'], response.data['count']), ('MISS', 4))
+
+    def test_invalid_buckets(self):
+        for value in ('a,b', '10,5', '1,nan', ','.join(str(n) for n in range(30))):
+            response = self.client.get(reverse('product-facets'), {'price_buckets': value})
+            self.assertEqual(response.status_code, 400, value)
+
+
+class FastListTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        root = Category.objects.create(name='Books')
+        Category.objects.create(name='Novels', parent_cat=root)
+        self.user = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass12345')
+        self.products = make_products(root, 4, self.user)
+        self.products[0].image_url = None
+        self.products[0].price = '1234.50'
+        self.products[0].save()
+        Review.objects.create(user=self.user, product=self.products[1], rating=2, title='Meh', comment=None)
+
+    def assertSameOutput(self, viewset, url, params=None):
+        get_cache().clear()
+        fast = self.client.get(url, params)
+        get_cache().clear()
+        with patch.object(viewset, 'fast_list', False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_products_match_serializer(self):
+        url = reverse('product-list')
+        self.assertSameOutput(ProductViewSet, url)
+        self.assertSameOutput(ProductViewSet, url, {'page_size': 2, 'ordering': '-price'})
+        self.assertSameOutput(ProductViewSet, url, {'search': 'product', 'fields': 'id,name,reviews'})
+        self.assertSameOutput(ProductViewSet, url, {'expand': 'images'})
+        # The ordering column is left out of the selected fields.
+        self.assertSameOutput(ProductViewSet, url, {'page_size': 2, 'fields': 'id,name'})
+
+    def test_reviews_and_categories_match_serializer(self):
+        self.assertSameOutput(ReviewViewSet, reverse('product-reviews-list', args=[self.products[1].pk]))
+        self.assertSameOutput(CategoryViewSet, reverse('category-list'))
+
+    def test_next_page_from_fast_path(self):
+        response = self.client.get(reverse('product-list'), {'page_size': 3})
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['id'] for item in response.data['results']], [self.products[0].pk])
+
+
+class AsyncReadTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.root = Category.objects.create(name='Books')
+        Category.objects.create(name='Novels', parent_cat=self.root)
+        self.user = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass12345')
+        self.products = make_products(self.root, 4, self.user)
+        self.async_client = AsyncClient()
+
+    async def assertSameAsSync(self, url, params=None):
+        await get_cache().aclear()
+        response = await self.async_client.get(url, params)
+        self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+        await get_cache().aclear()
+        expected = await sync_to_async(self.client.get)(url, params)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    async def test_reads_match_sync_views(self):
+        product = self.products[1]
+        await self.assertSameAsSync(reverse('product-list'))
+        await self.assertSameAsSync(reverse('product-list'), {'search': 'product', 'ordering': '-price'})
+        await self.assertSameAsSync(reverse('product-list'), {'category_tree': self.root.pk, 'fields': 'id,name'})
+        # The category filter looks its value up while validating.
+        await self.assertSameAsSync(reverse('product-list'), {'category': self.root.pk})
+        response = await self.assertSameAsSync(reverse('product-list'), {'category': 999999})
+        self.assertEqual(response.status_code, 400)
+        await self.assertSameAsSync(reverse('product-detail', args=[product.pk]), {'category': self.root.pk})
+        await self.assertSameAsSync(reverse('product-detail', args=[product.pk]))
+        await self.assertSameAsSync(reverse('product-detail', args=[product.pk]), {'expand': 'reviews'})
+        await self.assertSameAsSync(reverse('category-list'))
+        await self.assertSameAsSync(reverse('category-detail', args=[self.root.pk]))
+        await self.assertSameAsSync(reverse('product-reviews-list', args=[product.pk]))
+        review = await Review.objects.filter(product=product).afirst()
+        await self.assertSameAsSync(reverse('product-reviews-detail', args=[product.pk, review.pk]))
+
+    async def test_cursor_pages(self):
+        response = await self.assertSameAsSync(reverse('product-list'), {'page_size': 3})
+        next_url = json.loads(response.content)['next']
+        response = await self.assertSameAsSync(next_url)
+        self.assertEqual([item['id'] for item in json.loads(response.content)['results']], [self.products[0].pk])
+
+    async def test_missing_and_invalid_ids(self):
+        for url in [reverse('product-detail', args=[0]), '/api/v1/products/abc/',
+                    reverse('product-reviews-detail', args=[self.products[0].pk, 0])]:
+            response = await self.assertSameAsSync(url)
+            self.assertEqual(response.status_code, 404)
+
+    async def test_not_modified(self):
+        url = reverse('product-detail', args=[self.products[0].pk])
+        response = await self.async_client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        missing = reverse('product-detail', args=[999999])
+        response = await self.async_client.get(missing, headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_writes_use_sync_views(self):
+        url = reverse('product-reviews-list', args=[self.products[0].pk])
+        response = await self.async_client.post(url, {'rating': 5}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.post(
+            url, {'rating': 5}, content_type='application/json', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(await Review.objects.filter(product=self.products[0]).acount(), 2)
+
+
+class WishlistTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.client.force_authenticate(self.user)
+        self.products = make_products(Category.objects.create(name='Books'), 12)
+
+    def batch_add(self, products):
+        return self.client.post(reverse('wishlist-batch-add'), {'product_ids': [p.pk for p in products]}, format='json')
+
+    def test_batch_add_is_idempotent_and_constant(self):
+        self.batch_add(self.products[:1])
+        with CaptureQueriesContext(connection) as small:
+            response = self.batch_add(self.products[1:2])
+        self.assertEqual(response.status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            response = self.batch_add(self.products)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.data['already_listed'], [p.pk for p in self.products[:2]])
+        self.assertEqual(len(response.data['added']), 10)
+        self.assertEqual(self.batch_add(self.products[:3]).status_code, 200)
+        self.assertEqual(WishlistItem.objects.count(), 12)
+
+    def test_batch_add_rejects_unknown_products(self):
+        response = self.client.post(reverse('wishlist-batch-add'), {'product_ids': [self.products[0].pk, 0]},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('wishlist-batch-add'), {'product_ids': [999999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WishlistItem.objects.exists())
+
+    def test_batch_remove(self):
+        self.batch_add(self.products)
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('wishlist-batch-remove'),
+                                        {'product_ids': [p.pk for p in self.products[:5]] + [999999]}, format='json')
+        self.assertEqual(response.data, {'removed': 5})
+        self.assertEqual(WishlistItem.objects.count(), 7)
+
+    def test_compact_views_are_single_queries(self):
+        self.batch_add(self.products[:3])
+        self.products[0].qnt = 0
+        self.products[0].save()
+        url = reverse('wishlist')
+        with self.assertNumQueries(1):
+            cards = self.client.get(url, {'view': 'cards'}).data['items']
+        self.assertEqual({card['product_id'] for card in cards}, {p.pk for p in self.products[:3]})
+        card = next(card for card in cards if card['product_id'] == self.products[0].pk)
+        self.assertEqual(card, {
+            'product_id': self.products[0].pk, 'name': 'Product 0', 'price': '10.00',
+            'image_url': 'http://example.com/0.png', 'is_active': True, 'in_stock': False,
+            'date_added': card['date_added'],
+        })
+        with self.assertNumQueries(1):
+            ids = self.client.get(url, {'view': 'ids'}).data['product_ids']
+        self.assertEqual(ids, [card['product_id'] for card in cards])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, {'view': 'count'}).data, {'count': 3})
+        self.assertEqual(self.client.get(url, {'view': 'huge'}).status_code, 400)
+
+
+class BenchmarkSuiteTests(APITestCase):
+    def test_every_route_has_a_passing_case(self):
+        from benchmarks import api
+        from benchmarks.seed import seed
+
+        sizes = seed(scale=0.02, password='pass12345')
+        self.assertEqual(Product.objects.count(), sizes.products)
+        self.assertTrue(Category.objects.exclude(parent_cat=None).filter(path__startswith='/').exists())
+
+        fixtures = api.Fixtures('pass12345')
+        cases = api.build_cases(fixtures)
+        self.assertEqual(api.route_names() - {case.route for case in cases}, set())
+        results = {case.name: api.run_case(case, fixtures.clients(), repeat=1) for case in cases}
+        self.assertEqual(len(results), len(cases))
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        metrics_registry.reset()
+        make_products(Category.objects.create(name='Books'), 3)
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse('product-list'))
+        timing = response['Server-Timing']
+        for part in ('db;dur=', 'app;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(part, timing)
+        self.client.get(reverse('product-list'))
+        self.client.get('/api/v1/no-such-route/')
+
+        with override_settings(METRICS_TOKEN='secret'):
+            body = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        labels = 'route="product-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn('http_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        queries = [line for line in body.splitlines() if line.startswith(f'http_request_db_queries_total{{{labels}}}')]
+        self.assertGreater(int(queries[0].split()[-1]), 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_closed_without_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer None').status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('ecommerce_api.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('product-list'))
+        self.assertIn('(product-list)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.category = Category.objects.create(name='Books')
+        self.user = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass12345')
+        self.products = make_products(self.category, 3)
+
+    def assertNotModified(self, url, params=None, **headers):
+        get_cache().clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_list_not_modified_until_changed(self):
+        url = reverse('product-list')
+        for params in [None, {'search': 'product', 'page_size': 2}]:
+            response = self.client.get(url, params)
+            etag = response['ETag']
+            self.assertTrue(response.has_header('Last-Modified'))
+            self.assertNotModified(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertNotModified(url, params, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse('product-reviews-list', args=[self.products[0].pk]), {'rating': 5})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        self.products[2].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_star_matches_existing_objects_only(self):
+        for name, pk in [('product-detail', self.products[0].pk), ('category-detail', self.category.pk)]:
+            self.assertNotModified(reverse(name, args=[pk]), HTTP_IF_NONE_MATCH='*')
+            response = self.client.get(reverse(name, args=[999999]), HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, 404, name)
+        Product.objects.all().delete()
+        self.assertNotModified(reverse('product-list'), HTTP_IF_NONE_MATCH='*')
+
+    def test_detail_follows_images_and_category(self):
+        url = reverse('product-detail', args=[self.products[0].pk])
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, HTTP_IF_NONE_MATCH=etag)
+
+        ProductImage.objects.create(product=self.products[0], image_url='http://example.com/extra.png')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.category.name = 'Novels'
+        self.category.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).data['category'], 'Novels')
+
+    def test_category_detail_follows_subcategories(self):
+        url = reverse('category-detail', args=[self.category.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        Category.objects.create(name='Poetry', parent_cat=self.category)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['subcategories'], ['Poetry'])
+
+    def test_stock_changes_update_product(self):
+        before = Product.objects.get(pk=self.products[0].pk).updated_at
+        reserve({self.products[0].pk: 1})
+        self.assertGreater(Product.objects.get(pk=self.products[0].pk).updated_at, before)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_PRIMARY_PIN_SECONDS=10)
+class ReplicaRoutingTests(TransactionTestCase):
+    # TestCase would wrap every test in a transaction, which keeps reads on the primary.
+
+    def setUp(self):
+        get_pin_cache().clear()
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.router = ReplicaRouter()
+
+    def route(self, method, user=None, status=200, models=(Product, Order)):
+        request = getattr(RequestFactory(), method.lower())('/api/v1/products/')
+        if user is not None:
+            request.user = user
+        seen = {}
+
+        def view(request):
+            seen.update((model.__name__, self.router.db_for_read(model)) for model in models)
+            with transaction.atomic():
+                seen['atomic'] = self.router.db_for_read(Product)
+            return HttpResponse(status=status)
+
+        ReplicaRoutingMiddleware(view)(request)
+        return seen
+
+    def test_catalogue_reads_use_replica(self):
+        self.assertEqual(self.route('GET'), {'Product': 'replica', 'Order': None, 'atomic': None})
+        self.assertEqual(self.route('POST')['Product'], None)
+        self.assertIsNone(self.router.db_for_read(Product))
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    def test_writes_pin_user_to_primary(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345')
+        self.assertEqual(self.route('GET', self.user)['Product'], 'replica')
+        self.route('POST', self.user, status=400)
+        self.assertEqual(self.route('GET', self.user)['Product'], 'replica')
+        self.route('POST', self.user, status=201)
+        self.assertEqual(self.route('GET', self.user)['Product'], 'default')
+        self.assertEqual(self.route('GET', other)['Product'], 'replica')
+        get_pin_cache().clear()
+        self.assertEqual(self.route('GET', self.user)['Product'], 'replica')
+
+    def test_cached_responses_are_built_from_primary(self):
+        get_cache().clear()
+        category = Category.objects.create(name='Books')
+        product = make_products(category, 2)[0]
+        routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            routed.append(db_for_read(router, model, **hints))
+            return None  # `replica` is not a configured database
+
+        with patch.object(ReplicaRouter, 'db_for_read', record):
+            for name, args in [('product-list', []), ('category-detail', [category.pk]), ('category-tree', [])]:
+                response = self.client.get(reverse(name, args=args))
+                self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'), name)
+            self.assertNotIn('replica', routed)
+            self.client.get(reverse('product-reviews-list', args=[product.pk]))
+        self.assertIn('replica', routed)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertIsNone(self.route('GET')['Product'])
+        self.assertEqual(self.client.get(reverse('product-list')).status_code, 200)
+
+
+class SQLiteProfileTests(APITestCase):
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only.')
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': -2048})
+    def test_pragmas_applied(self):
+        configure_connection(None, connection)
+        self.assertEqual((self.pragma('busy_timeout'), self.pragma('cache_size')), (1234, -2048))
+
+    def test_write_queue_is_fifo_and_reentrant(self):
+        queue, served = WriteQueue(), []
+
+        def write(n):
+            with queue:
+                served.append(n)
+
+        with queue:
+            with queue:
+                served.append('main')
+            threads = []
+            for n in range(5):
+                threads.append(threading.Thread(target=write, args=(n,)))
+                threads[-1].start()
+                while queue.next_ticket < n + 2:  # queued behind the previous writer
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(served, ['main', 0, 1, 2, 3, 4])
+
+    @override_settings(SQLITE_SERIALIZE_WRITES=True)
+    def test_order_writes_are_queued(self):
+        product = make_products(Category.objects.create(name='Books'), 1)[0]
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.client.force_authenticate(user)
+        before = write_queue.serving
+        self.assertEqual(self.client.get(reverse('order-list')).status_code, 200)
+        self.assertEqual(write_queue.serving, before)
+        items = [{'product_id': product.pk, 'quantity': 1}]
+        self.assertEqual(self.client.post(reverse('order-list'), {'items': items}, format='json').status_code, 200)
+        self.assertEqual(self.client.post(reverse('wishlist-batch-add'), {'product_ids': [product.pk]},
+                                          format='json').status_code, 201)
+        self.assertEqual(write_queue.serving, before + 2)
+
+
+class IndexUsageTests(APITestCase):
+    """EXPLAIN the hot lookups of views.py and serializers.py; none may scan its table."""
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('EXPLAIN checks are written for SQLite and PostgreSQL.')
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pass12345')
+        self.category = Category.objects.create(name='Books')
+        self.product = make_products(self.category, 1, self.user)[0]
+
+    def disable_seqscan(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Tiny test tables would otherwise always be scanned.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, *names, sorts=False):
+        self.disable_seqscan()
+        return self.assertPlanUsesIndex(queryset.explain(), queryset.model._meta.db_table, *names, sorts=sorts)
+
+    def assertPlanUsesIndex(self, plan, table, *names, sorts=False):
+        """`sorts` allows a sort of the rows found, for orderings no single index can supply."""
+        if connection.vendor == 'sqlite':
+            self.assertNotRegex(plan, rf'SCAN {table}(?! USING)')
+            if not sorts:
+                self.assertNotIn('USE TEMP B-TREE', plan)
+        else:
+            self.assertNotIn(f'Seq Scan on {table}', plan)
+        if names:
+            self.assertTrue(any(name in plan for name in names), plan)
+        return plan
+
+    def explain_queries(self, run):
+        """EXPLAIN each SELECT that `run()` sends, exactly as it was sent."""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        self.disable_seqscan()
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    cursor.execute(prefix + query['sql'])
+                    plans.append('\n'.join(str(row[-1]) for row in cursor.fetchall()))
+        return plans
+
+    def assertSeeks(self, queryset, name=None):
+        """Like assertUsesIndex, and the index is entered at a key rather than walked from one end."""
+        plan = self.assertUsesIndex(queryset, *filter(None, [name]))
+        if connection.vendor == 'sqlite':
+            index = name or r'\w+'
+            self.assertRegex(plan, rf'SEARCH {queryset.model._meta.db_table} USING (COVERING )?INDEX {index} \(')
+        else:
+            self.assertIn('Index Cond', plan)
+
+    def cursor_page(self, queryset, ordering, instance=None):
+        # The filter KeysetPagination puts on every page after the first.
+        position = [getattr(instance or self.product, field.lstrip('-')) for field in ordering]
+        filtered = queryset.filter(KeysetPagination().keyset_filter(ordering, position))
+        return filtered.order_by(*ordering)[:21]
+
+    def test_product_lists(self):
+        ordering = ProductViewSet.ordering
+        products = Product.objects.all()
+        self.assertUsesIndex(products.order_by(*ordering)[:21], 'product_created_idx')
+        self.assertUsesIndex(products.order_by('price', 'id')[:21], 'product_price_idx')
+        self.assertUsesIndex(products.order_by('-qnt', '-id')[:21], 'product_qnt_idx')
+        self.assertUsesIndex(products.filter(category=self.category, is_active=True).order_by(*ordering)[:21],
+                             'product_active_category_idx')
+        self.assertUsesIndex(products.filter(category=self.category, is_active=False), 'product_category_active_idx')
+
+    def test_product_cursor_pages_seek(self):
+        products = Product.objects.all()
+        self.assertSeeks(self.cursor_page(products, ProductViewSet.ordering), 'product_created_idx')
+        self.assertSeeks(self.cursor_page(products, ('price', 'id')), 'product_price_idx')
+        self.assertSeeks(self.cursor_page(products, ('-qnt', '-id')), 'product_qnt_idx')
+
+    def test_category_tree_seeks(self):
+        Category.objects.create(name='Novels', parent_cat=self.category)
+        products = ProductFilter({'category_tree': self.category.pk}, queryset=Product.objects.all()).qs
+        for queryset in (products, products.filter(is_active=True)):
+            # A subtree spans several categories, so its rows are sorted;
+            # both tables must still be entered at a key.
+            page = self.cursor_page(queryset, ProductViewSet.ordering)
+            plan = self.assertUsesIndex(page, 'product_category_active_idx', 'product_active_category_idx', sorts=True)
+            if connection.vendor == 'sqlite':
+                self.assertRegex(plan, r'SEARCH products_category USING (COVERING )?INDEX \w+ \(path>\? AND path<\?\)')
+            else:
+                self.assertNotIn('Seq Scan on products_category', plan)
+
+    def test_order_lookups(self):
+        # The open cart, looked up with .first() on every order create.
+        plans = self.explain_queries(lambda: Order.objects.filter(user=self.user, status='Pending').first())
+        self.assertEqual(len(plans), 1)
+        self.assertPlanUsesIndex(plans[0], 'products_order', 'order_user_status_idx', 'order_user_pending_idx')
+        orders = Order.objects.filter(user=self.user)
+        self.assertUsesIndex(orders.order_by('-pk')[:21])
+        self.assertSeeks(self.cursor_page(orders, ('-pk',), Order.objects.create(user=self.user)))
+        self.assertUsesIndex(OrderItem.objects.filter(order__user=self.user))
+        self.assertUsesIndex(idle_carts()[:500], 'order_pending_activity_idx')
+
+    def test_wishlist_and_review_lookups(self):
+        wishlist = Wishlist.objects.create(user=self.user)
+        self.assertUsesIndex(WishlistItem.objects.filter(wishlist=wishlist, product=self.product))
+        reviews = Review.objects.filter(product=self.product)
+        self.assertUsesIndex(reviews.order_by('-pk')[:21], 'review_product_idx')
+        self.assertSeeks(self.cursor_page(reviews, ('-pk',), reviews.get()), 'review_product_idx')
+
+    def test_wishlist_items_are_unique(self):
+        self.client.force_authenticate(self.user)
+        data = {'product_id': self.product.pk}
+        self.assertEqual(self.client.post(reverse('wishlist'), data).status_code, 201)
+        self.assertEqual(self.client.post(reverse('wishlist'), data).status_code, 400)
+        self.assertEqual(WishlistItem.objects.count(), 1)
+        self.assertEqual(self.client.post(reverse('wishlist-remove'), data).status_code, 200)
+        self.assertEqual(self.client.post(reverse('wishlist-remove'), data).status_code, 400)
+
+    def test_reviews_are_listed_per_product(self):
+        other = make_products(self.category, 1, self.user)[0]
+        response = self.client.get(reverse('product-reviews-list', args=[other.pk]))
+        self.assertEqual([review['product'] for review in response.data['results']], [other.pk])
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet, ReviewViewSet, WishlistViewSet, OrderViewSet, ProductImageViewSet,OrderItemViewSet
+from .views import CategoryViewSet, ProductViewSet, ReviewViewSet, WishlistViewSet, OrderViewSet, ProductImageViewSet,OrderItemViewSet, CatalogueCacheStatsView, ExportView, ProductImportView
 from rest_framework_nested import routers
 
 
@@ -29,11 +29,24 @@ wishlist_remove = WishlistViewSet.as_view({
     'post': 'remove'
 })
 
+wishlist_batch_add = WishlistViewSet.as_view({
+    'post': 'batch_add'
+})
+
+wishlist_batch_remove = WishlistViewSet.as_view({
+    'post': 'batch_remove'
+})
+
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(products_router.urls)),
     path('wishlist/', wishlist_list, name='wishlist'),
     path('wishlist/remove/', wishlist_remove, name='wishlist-remove'),
+    path('wishlist/batch-add/', wishlist_batch_add, name='wishlist-batch-add'),
+    path('wishlist/batch-remove/', wishlist_batch_remove, name='wishlist-batch-remove'),
+    path('cache-stats/', CatalogueCacheStatsView.as_view(), name='cache-stats'),
+    path('export/<str:dataset>/', ExportView.as_view(), name='export'),
+    path('import/products/', ProductImportView.as_view(), name='product-import'),
 ]
 
 
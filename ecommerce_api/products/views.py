@@ -1,45 +1,131 @@
-from rest_framework import viewsets, permissions, filters, status
-from rest_framework.filters import OrderingFilter
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from users.permissions import IsAdminUser
+from ecommerce_api.sqlite import SerializedWritesMixin
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Product, Category, Review, WishlistItem, Wishlist, Order, OrderItem, ProductImage
+from .models import (Product, Category, Review, WishlistItem, Wishlist, Order, OrderItem, ProductImage,
+                     product_prefetches)
 from .serializers import (ProductSerializer, CategorySerializer, ReviewSerializer, WishlistItemSerializer, 
-                          WishlistSerializer, OrderSerializer, OrderItemSerializer, ProductImageSerializer)
-from .filters import ProductFilter
+                          WishlistSerializer, OrderSerializer, OrderItemSerializer, ProductImageSerializer,
+                          WishlistCardSerializer, WishlistBatchSerializer, OrderSummarySerializer,
+                          OrderBulkCancelSerializer, ProductFacetsSerializer, expanded_relations)
+from .filters import ProductFilter, ProductSearchFilter, ProductOrderingFilter
 from django.shortcuts import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from . import export, importer
+import io
+import os
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, OuterRef, Prefetch, Q, Subquery, prefetch_related_objects
+from .ratings import apply_rating_change, lock_ratings
+from .inventory import InsufficientStock, group_quantities, release, reserve
+from .order_totals import apply_order_change, line_totals
+from .cancellation import cancel_orders, filter_orders
+from .facets import product_facets
+from .cache import CachedResponseMixin, stats as cache_stats
+from .async_views import AsyncReadMixin
+from .conditional import ConditionalGetMixin
+from .fastpath import (FastListMixin, PRODUCT_STRING_COLUMNS, REVIEW_STRING_COLUMNS, product_image_urls,
+                       product_reviews, category_subcategory_names)
+from rest_framework.views import APIView
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+def related_product_prefetches(request, item_model, items):
+    """
+    Prefetch lookups for order/wishlist lines (`items`) and their products,
+    limited to the product relations the request will actually render.
+    Write responses render every relation, as SparseFieldsetMixin does.
+    """
+    expanded = ProductSerializer.expandable_fields
+    if request.method in permissions.SAFE_METHODS:
+        expanded = expanded_relations(request, f'{items}.product', expanded)
+    return [
+        Prefetch(items, queryset=item_model.objects.select_related('product__category')),
+        *product_prefetches(f'{items}__product__', reviews='reviews' in expanded, images='images' in expanded),
+    ]
+
+
+class CategoryViewSet(ConditionalGetMixin, CachedResponseMixin, FastListMixin, AsyncReadMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.prefetch_related('subcategories')
     serializer_class = CategorySerializer
+    cache_dependencies = ['category']
+    fast_relations = {'subcategories': category_subcategory_names}
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'tree']:
             permission_classes = [permissions.AllowAny]
         else:
             permission_classes = [permissions.IsAuthenticated, IsAdminUser]
         return [permission() for permission in permission_classes]
 
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        return self.conditional_response(Category.objects.all(), lambda request: self.cached_response(self._tree, request),
+                                         request)
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+    def _tree(self, request):
+        # Ordering by path yields every parent before its children.
+        nodes, roots = {}, []
+        for row in Category.objects.order_by('path').values('id', 'name', 'parent_cat'):
+            node = nodes[row['id']] = {**row, 'children': []}
+            parent = nodes.get(row['parent_cat'])
+            (parent['children'] if parent else roots).append(node)
+        return Response(roots)
+
+
+class ProductViewSet(ConditionalGetMixin, CachedResponseMixin, FastListMixin, AsyncReadMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.with_related()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, OrderingFilter]
+    cache_dependencies = ['product', 'category', 'review', 'productimage']
+    conditional_timestamps = ('updated_at', 'category__updated_at')
+    fast_string_columns = PRODUCT_STRING_COLUMNS
+    fast_relations = {'image_url': product_image_urls, 'reviews': product_reviews}
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter]
     filterset_fields = ['category', 'is_active']
     search_fields = ['name', 'description']
     filterset_class = ProductFilter
-    ordering_fields = ['price', 'qnt', 'created_date']
+    ordering_fields = ['price', 'qnt', 'created_date', 'rating_avg', 'rating_count']
+    ordering = ['-created_date', '-id']
+    # Query parameters that shape a product page but not the set of
+    # products, so facets are cached per filter signature alone.
+    facets_ignored_params = {'ordering', 'cursor', 'page_size', 'fields', 'expand'}
+
+    def get_queryset(self):
+        expanded = expanded_relations(self.request, '', ProductSerializer.expandable_fields)
+        return Product.objects.with_related(reviews='reviews' in expanded, images='images' in expanded)
+
+    def get_response_cache_params(self, request):
+        params = super().get_response_cache_params(request)
+        if self.action == 'facets':
+            return [(key, value) for key, value in params if key not in self.facets_ignored_params]
+        return params
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Counts per category, price range, is_active and in-stock for the
+        products matching the list's filters and `?search=`, in two queries.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, lambda request: self.cached_response(self._facets, request),
+                                         request)
+
+    def _facets(self, request):
+        serializer = ProductFacetsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(product_facets(queryset, serializer.validated_data['price_buckets']))
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'facets']:
             permission_classes = [permissions.AllowAny]
         else:
             permission_classes = [permissions.IsAuthenticated, IsAdminUser]
         return [permission() for permission in permission_classes]
     
-class ProductImageViewSet(viewsets.ModelViewSet):
+class ProductImageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
     serializer_class = ProductImageSerializer
 
@@ -51,9 +137,13 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, FastListMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    fast_string_columns = REVIEW_STRING_COLUMNS
+
+    def get_queryset(self):
+        return Review.objects.filter(product_id=self.kwargs['product_pk']).select_related('user')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -62,18 +152,64 @@ class ReviewViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    @transaction.atomic
     def perform_create(self, serializer):
         product_id = self.kwargs.get('product_pk')
         product = get_object_or_404(Product, pk=product_id)
-        serializer.save(user=self.request.user, product=product)
+        review = serializer.save(user=self.request.user, product=product)
+        apply_rating_change(review.product_id, added=review.rating)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        review = serializer.instance
+        lock_ratings(review.product_id)
+        try:
+            # Re-read under the lock: a concurrent edit may have moved the
+            # rating since get_object(), and save() writes every column.
+            review.refresh_from_db()
+        except Review.DoesNotExist:
+            raise Http404
+        old_rating = review.rating
+        review = serializer.save()
+        if review.rating != old_rating:
+            apply_rating_change(review.product_id, added=review.rating, removed=old_rating)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        lock_ratings(instance.product_id)
+        rating = Review.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+        # Only the request that actually deletes the row takes it out of the stats.
+        deleted, _ = Review.objects.filter(pk=instance.pk).delete()
+        if deleted:
+            apply_rating_change(instance.product_id, removed=rating)
 
-class WishlistViewSet(viewsets.ViewSet):
+
+class WishlistViewSet(SerializedWritesMixin, viewsets.ViewSet):
+    """
+    The user's wishlist. `?view=` picks the read: `full` (default, items
+    with the full product), `cards` (compact product cards), `ids` (listed
+    product ids) or `count`; each of the last three is one query. `add` and
+    `remove` take one `product_id`; `batch_add` and `batch_remove` take up
+    to 100 `product_ids` and run a fixed number of statements.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    views = ('full', 'cards', 'ids', 'count')
 
     def list(self, request):
+        view = request.query_params.get('view', 'full')
+        if view not in self.views:
+            raise ValidationError({'view': f"Expected one of {', '.join(self.views)}."})
+        items = WishlistItem.objects.filter(wishlist__user=request.user)
+        if view == 'count':
+            return Response({'count': items.count()})
+        if view == 'ids':
+            return Response({'product_ids': list(items.order_by('-date_added', '-id').values_list('product_id', flat=True))})
+        if view == 'cards':
+            return Response({'items': WishlistCardSerializer(self.card_rows(items), many=True).data})
+
         wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        serializer = WishlistSerializer(wishlist)
+        prefetch_related_objects([wishlist], *related_product_prefetches(request, WishlistItem, 'items'))
+        serializer = WishlistSerializer(wishlist, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
@@ -82,9 +218,12 @@ class WishlistViewSet(viewsets.ViewSet):
         serializer = WishlistItemSerializer(data=request.data)
         if serializer.is_valid():
             product = serializer.validated_data['product']
-            if WishlistItem.objects.filter(wishlist=wishlist, product=product).exists():
+            try:
+                with transaction.atomic():
+                    WishlistItem.objects.create(wishlist=wishlist, product=product)
+            except IntegrityError:
+                # unique_wishlist_product: the product is already listed.
                 return Response({'detail': 'Product already in wishlist.'}, status=status.HTTP_400_BAD_REQUEST)
-            WishlistItem.objects.create(wishlist=wishlist, product=product)
             return Response({'detail': 'Product added to wishlist.'}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -94,21 +233,83 @@ class WishlistViewSet(viewsets.ViewSet):
         serializer = WishlistItemSerializer(data=request.data)
         if serializer.is_valid():
             product = serializer.validated_data['product']
-            try:
-                item = WishlistItem.objects.get(wishlist=wishlist, product=product)
-                item.delete()
+            deleted, _ = WishlistItem.objects.filter(wishlist=wishlist, product=product).delete()
+            if deleted:
                 return Response({'detail': 'Product removed from wishlist.'}, status=status.HTTP_200_OK)
-            except WishlistItem.DoesNotExist:
-                return Response({'detail': 'Product not found in wishlist.'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'Product not found in wishlist.'}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def batch_add(self, request):
+        serializer = WishlistBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_ids = serializer.validated_data['product_ids']
+        known = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        unknown = [pk for pk in product_ids if pk not in known]
+        if unknown:
+            raise ValidationError({'product_ids': [f'Invalid pk(s): {", ".join(map(str, unknown))}.']})
+
+        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
+        listed = set() if created else set(
+            WishlistItem.objects.filter(wishlist=wishlist, product_id__in=product_ids).values_list('product_id', flat=True)
+        )
+        added = [pk for pk in product_ids if pk not in listed]
+        # ignore_conflicts: a concurrent request may list the same product first.
+        WishlistItem.objects.bulk_create(
+            [WishlistItem(wishlist=wishlist, product_id=pk) for pk in added], ignore_conflicts=True
+        )
+        return Response({'added': added, 'already_listed': [pk for pk in product_ids if pk in listed]},
+                        status=status.HTTP_201_CREATED if added else status.HTTP_200_OK)
 
-class OrderViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def batch_remove(self, request):
+        serializer = WishlistBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        removed, _ = WishlistItem.objects.filter(
+            wishlist__user=request.user, product_id__in=serializer.validated_data['product_ids']
+        ).delete()
+        return Response({'removed': removed}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def card_rows(items):
+        first_image = ProductImage.objects.filter(product=OuterRef('product')).order_by('pk').values('image_url')[:1]
+        return items.order_by('-date_added', '-id').values(
+            'product_id', 'date_added',
+            name=F('product__name'),
+            price=F('product__price'),
+            is_active=F('product__is_active'),
+            image_url=Subquery(first_image),
+            in_stock=ExpressionWrapper(Q(product__qnt__gt=0), output_field=BooleanField()),
+        )
+
+
+class OrderViewSet(SerializedWritesMixin, viewsets.ModelViewSet):
+    """
+    The user's orders. `?view=summary` lists orders without their lines,
+    from the orders table alone. `bulk_cancel` (admins) cancels every
+    pending order matching the posted filters.
+    """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_permissions(self):
+        if self.action == 'bulk_cancel':
+            return [permissions.IsAuthenticated(), IsAdminUser()]
+        return super().get_permissions()
+
+    def is_summary(self):
+        return self.action == 'list' and self.request.query_params.get('view') == 'summary'
+
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = Order.objects.filter(user=self.request.user)
+        if self.is_summary():
+            return queryset.only(*OrderSummarySerializer.Meta.fields)
+        return queryset.prefetch_related(*related_product_prefetches(self.request, OrderItem, 'items'))
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return OrderSummarySerializer
+        return super().get_serializer_class()
 
     def create(self, request, *args, **kwargs):
         user = request.user
@@ -121,13 +322,18 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        prefetch_related_objects([serializer.instance], *related_product_prefetches(request, OrderItem, 'items'))
         return Response(serializer.data, status=status.HTTP_200_OK)
     
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        product = instance.product
-        product.qnt += instance.quantity
-        product.save()
+        # Lock the order as close_batch does, so a concurrent cancel, expiry
+        # or DELETE cannot release the same lines twice, and read the lines
+        # after the lock so one added meanwhile is released too.
+        if not Order.objects.select_for_update().filter(pk=instance.pk, status='Pending').exists():
+            raise ValidationError({'detail': 'This order is no longer pending.'})
+        release(group_quantities(OrderItem.objects.filter(order_id=instance.pk).values_list('product_id', 'quantity')))
         self.perform_destroy(instance)
         return Response({"detail": "Item deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
@@ -135,30 +341,127 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         order = self.get_object()
-        if order.status != 'Pending':
+        if not cancel_orders(Order.objects.filter(pk=order.pk))['cancelled']:
             return Response(
                 {'detail': 'Cannot cancel a non-pending order.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        for item in order.items.all():
-            product = item.product
-            product.qnt += item.quantity
-            product.save()
-        order.status = 'Cancelled'
-        order.save()
         return Response({'detail': 'Order cancelled.'}, status=status.HTTP_200_OK)
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='bulk-cancel')
+    def bulk_cancel(self, request):
+        serializer = OrderBulkCancelSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criteria = dict(serializer.validated_data)
+        dry_run = criteria.pop('dry_run')
+        orders = filter_orders(Order.objects.all(), **criteria)
+        if dry_run:
+            return Response({'matched': orders.filter(status='Pending').count()}, status=status.HTTP_200_OK)
+        return Response(cancel_orders(orders), status=status.HTTP_200_OK)
+
+class OrderItemViewSet(SerializedWritesMixin, viewsets.ModelViewSet):
     serializer_class = OrderItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return OrderItem.objects.filter(order__user=self.request.user)
+        expanded = expanded_relations(self.request, 'product', ProductSerializer.expandable_fields)
+        return OrderItem.objects.filter(order__user=self.request.user).select_related('product__category').prefetch_related(
+            *product_prefetches('product__', reviews='reviews' in expanded, images='images' in expanded)
+        )
+
+    def lock_line(self, item):
+        """
+        Lock the line's order and return the line's stored product_id,
+        quantity and price. Lines of an order that is no longer pending are
+        settled, their stock released (Cancelled, Expired) or shipped, and
+        cannot change.
+        """
+        if not Order.objects.select_for_update().filter(pk=item.order_id, status='Pending').exists():
+            raise ValidationError({'detail': 'This order is no longer pending.'})
+        # Read after the lock, so concurrent edits of a line each start from
+        # the quantity the previous one left.
+        line = OrderItem.objects.filter(pk=item.pk).values_list('product_id', 'quantity', 'price').first()
+        if line is None:
+            raise Http404
+        return line
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        product_id, quantity, price = self.lock_line(serializer.instance)
+        product = serializer.validated_data.get('product')
+        if product is not None and product.pk != product_id:
+            raise ValidationError({'product_id': 'The product of an order line cannot be changed.'})
+        new_quantity = serializer.validated_data.get('quantity', quantity)
+        try:
+            reserve({product_id: new_quantity - quantity} if new_quantity > quantity else {})
+        except InsufficientStock as exc:
+            raise ValidationError(exc.messages())
+        release({product_id: quantity - new_quantity} if new_quantity < quantity else {})
+        item = serializer.save()
+        apply_order_change(item.order_id, *line_totals([(price, new_quantity - quantity)]))
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        product = instance.product
-        product.qnt += instance.quantity
-        product.save()
+        product_id, quantity, price = self.lock_line(instance)
+        release({product_id: quantity})
+        apply_order_change(instance.order_id, *line_totals([(price, -quantity)]))
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CatalogueCacheStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class ExportView(APIView):
+    """
+    Streams a whole dataset as NDJSON (default) or CSV: `?output=csv`,
+    `?since=<ISO date/datetime>` for rows created or updated after that
+    instant (see export.DATASETS for what counts as an update).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def get(self, request, dataset):
+        if dataset not in export.DATASETS:
+            raise Http404
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.FORMATS:
+            raise ValidationError({'output': f"Expected one of {', '.join(export.FORMATS)}."})
+        try:
+            since = export.parse_since(request.query_params.get('since'))
+        except ValueError as exc:
+            raise ValidationError({'since': str(exc)})
+
+        response = StreamingHttpResponse(export.render(dataset, output, since=since),
+                                         content_type=export.CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+        return response
+
+
+class ProductImportView(APIView):
+    """
+    Upserts products from an uploaded CSV or NDJSON `file`, keyed on `sku`.
+    The format comes from `?input=` or the file extension; `?batch_size=`
+    sets the rows written per statement.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'This field is required.'})
+        input_format = request.query_params.get('input') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if input_format not in importer.FORMATS:
+            raise ValidationError({'input': f"Expected one of {', '.join(importer.FORMATS)}."})
+        try:
+            batch_size = int(request.query_params.get('batch_size', 1000))
+        except ValueError:
+            raise ValidationError({'batch_size': 'A valid integer is required.'})
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = importer.import_products(importer.read_rows(stream, input_format), batch_size=max(batch_size, 1))
+        return Response(report, status=status.HTTP_200_OK)
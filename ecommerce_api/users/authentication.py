@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# Columns making up a cached principal: what permission checks and
+# `str(user)` read. Any other attribute is loaded on first access.
+PRINCIPAL_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser', 'is_admin')
+
+
+def get_cache():
+    return caches[settings.AUTH_PRINCIPAL_CACHE_ALIAS]
+
+
+def _principal_key(user_id):
+    return f'auth:principal:{user_id}'
+
+
+def _forget(user_ids):
+    get_cache().delete_many([_principal_key(user_id) for user_id in user_ids])
+
+
+def invalidate_principals(*user_ids):
+    """
+    Drop the cached principals of `user_ids`. Saving or deleting a user does
+    this through signals; call it after queryset updates to users. Inside a
+    transaction the entries are dropped again on commit, so a principal
+    cached by a concurrent request before the commit is not served after it.
+    """
+    _forget(user_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _forget(user_ids))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a user-table query per request.
+
+    The user is built from the token's user id claim and a principal record
+    (PRINCIPAL_FIELDS) cached for `AUTH_PRINCIPAL_CACHE_TIMEOUT` seconds and
+    dropped whenever the user is saved or deleted, so deactivation and role
+    changes apply on the next request rather than at token expiry. The user
+    is a model instance with the remaining fields deferred. With simplejwt's
+    CHECK_REVOKE_TOKEN on, the password hash is needed and the user is
+    loaded as usual.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        record = self.get_principal(user_id)
+        if record is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not record['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        # from_db() takes the loaded values in model field order.
+        names = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in record]
+        return self.user_model.from_db(self.user_model.objects.db, names, [record[name] for name in names])
+
+    def get_principal(self, user_id):
+        cache = get_cache()
+        key = _principal_key(user_id)
+        record = cache.get(key)
+        if record is None:
+            record = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values(*PRINCIPAL_FIELDS).first()
+            if record is None:
+                return None
+            cache.set(key, record, settings.AUTH_PRINCIPAL_CACHE_TIMEOUT)
+        return record
@@ -0,0 +1,9 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_principals
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_principal(sender, instance, **kwargs):
+    invalidate_principals(instance.pk)
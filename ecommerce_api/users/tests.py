@@ -1,3 +1,60 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import get_cache, invalidate_principals
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if User._meta.db_table in q['sql']]
+
+    def test_user_loaded_once(self):
+        url = reverse('wishlist')
+        response, queries = self.user_queries(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.user_queries(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_review_author_from_principal(self):
+        from products.models import Category, Product
+        product = Product.objects.create(name='Lamp', description='desc', price='5.00', qnt=3,
+                                         category=Category.objects.create(name='Home'))
+        response = self.client.post(reverse('product-reviews-list', args=[product.pk]), {'rating': 4})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user'], 'shopper')
+
+    def test_deactivation_and_role_changes_apply_at_once(self):
+        self.assertEqual(self.client.get(reverse('cache-stats')).status_code, 403)
+        self.user.is_admin = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('cache-stats')).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('wishlist')).status_code, 401)
+
+    def test_queryset_updates_need_invalidation(self):
+        self.client.get(reverse('wishlist'))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('wishlist')).status_code, 200)
+        invalidate_principals(self.user.pk)
+        self.assertEqual(self.client.get(reverse('wishlist')).status_code, 401)
+
+    def test_deleted_user(self):
+        self.client.get(reverse('wishlist'))
+        self.user.delete()
+        self.assertEqual(self.client.get(reverse('wishlist')).status_code, 401)